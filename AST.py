@@ -84,6 +84,7 @@ class AssignNode(ExpressionNode):
     def __init__(self, idx, expr):
         self.id = idx
         self.expr = expr
+        self.address = None
 
 class CallNode(ExpressionNode):
     def __init__(self, obj, idx, args):
@@ -112,7 +113,9 @@ class ConstantNumNode(AtomicNode):
 class ConstantStringNode(AtomicNode):
     pass
 class VariableNode(AtomicNode):
-    pass
+    def __init__(self, lex):
+        self.lex = lex
+        self.address = None
 class InstantiateNode(AtomicNode):
     pass
 class PlusNode(OperationNode):
@@ -0,0 +1,118 @@
+"""
+Compiles every .cl file under a directory with a pool of worker processes.
+
+    python batch.py [directory] [-j JOBS] [-o OUTPUT] [--cache DIR] [--profile]
+
+The parser tables are built once before the pool starts; on platforms with
+`fork` the workers inherit them. The output of every file is written to
+OUTPUT/<file>.out, and OUTPUT/summary.json aggregates the results. With
+--cache, files compiled before by the same compiler are answered from the
+result cache in DIR.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import time
+import traceback
+
+from cmp.tools.Old.automata03 import LexerError
+from grammar import G
+from pipeline import Pipeline
+
+_pipeline = None
+
+def init_worker(cache_dir=None, profile=False):
+    global _pipeline
+    if _pipeline is None:
+        _pipeline = Pipeline(G, cache_dir, profile)
+
+def compile_file(job):
+    filename, directory, output = job
+    start = time.perf_counter()
+    try:
+        with open(os.path.join(directory, filename), 'r', encoding='utf8') as file:
+            text = file.read()
+        report = _pipeline(text)
+        errors = len(_pipeline.errors)
+        status = 'ok' if not errors else 'errors'
+    except LexerError as err:
+        report = err.text
+        errors = 1
+        status = 'errors'
+    except Exception:
+        report = traceback.format_exc()
+        errors = 0
+        status = 'crashed'
+    elapsed = time.perf_counter() - start
+
+    if output is not None:
+        path = os.path.join(output, filename + '.out')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf8') as file:
+            file.write(report)
+    result = { 'file': filename, 'status': status, 'errors': errors, 'seconds': elapsed }
+    if _pipeline.profiler.enabled:
+        result['profile'] = _pipeline.profiler.report()
+    return result
+
+def find_sources(directory):
+    sources = []
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if name.endswith('.cl'):
+                sources.append(os.path.relpath(os.path.join(root, name), directory))
+    return sorted(sources)
+
+def run(directory, jobs=None, output=None, cache_dir=None, profile=False):
+    global _pipeline
+    jobs = jobs or os.cpu_count() or 1
+    sources = find_sources(directory)
+    start = time.perf_counter()
+    # Build the tables in the parent so forked workers start warm
+    _pipeline = Pipeline(G, cache_dir, profile)
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+    work = [ (source, directory, output) for source in sources ]
+    chunksize = max(1, len(work) // (jobs * 8))
+    with context.Pool(jobs, initializer=init_worker, initargs=(cache_dir, profile)) as pool:
+        results = list(pool.imap_unordered(compile_file, work, chunksize))
+    results.sort(key=lambda result: result['file'])
+
+    summary = {
+        'directory': directory,
+        'jobs': jobs,
+        'files': len(results),
+        'ok': sum(result['status'] == 'ok' for result in results),
+        'with_errors': sum(result['status'] == 'errors' for result in results),
+        'crashed': sum(result['status'] == 'crashed' for result in results),
+        'errors': sum(result['errors'] for result in results),
+        'compile_seconds': sum(result['seconds'] for result in results),
+        'wall_seconds': time.perf_counter() - start,
+        'results': results,
+    }
+    if output is not None:
+        with open(os.path.join(output, 'summary.json'), 'w', encoding='utf8') as file:
+            json.dump(summary, file, indent=2)
+    return summary
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compile a directory of Cool programs in parallel.")
+    parser.add_argument('directory', nargs='?', default='./cool_scripts_auto/')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help="worker processes (default: one per core)")
+    parser.add_argument('-o', '--output', default='./batch_output/', help="directory for the per-file output and summary.json")
+    parser.add_argument('--cache', default=None, help="directory caching the results of unchanged files")
+    parser.add_argument('--profile', action='store_true', help="record the time and memory of every stage in summary.json")
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.output, exist_ok=True)
+    summary = run(args.directory, args.jobs, args.output, args.cache, args.profile)
+    for result in summary['results']:
+        if result['status'] != 'ok':
+            print(f"{result['file']:<40}{result['status']:>10}{result['errors']:>6}")
+    print(f"{summary['files']} files: {summary['ok']} ok, {summary['with_errors']} with errors, {summary['crashed']} crashed")
+    print(f"{summary['jobs']} jobs, {summary['wall_seconds']:.2f} s wall, {summary['compile_seconds']:.2f} s compiling")
+    return 1 if summary['with_errors'] or summary['crashed'] else 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
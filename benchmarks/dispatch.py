@@ -0,0 +1,88 @@
+"""
+Measures the per-visit overhead of the visitor dispatch.
+
+    python -m benchmarks.dispatch [size_kb] [repeat]
+
+Every recursive visitor runs over the same generated program twice: once
+through the `static_dispatch` tables and once through the `when` wrapper
+that calls the `Dispatcher` on every visit, as undecorated classes do.
+Passes run by the PassManager resolve their hooks once per node class
+either way, so they are left out.
+"""
+import sys
+import time
+
+from benchmarks.lexer import generate_source
+from cmp.tools.LR1_Parser import LR1Parser
+from cmp.visitor import Dispatcher
+from grammar import G, lexer
+from inference_gatherer import InferenceGatherer
+from type_collector_builder import TypeBuilder, TypeCollector
+from type_inferencer import TypeInferencer
+from type_linker import TypeLinker
+from type_logger import TypeLogger
+from variable_resolver import VariableResolver
+
+
+def with_dispatch(cls, wrap):
+    namespace = {}
+    for name in dir(cls):
+        dispatcher = getattr(getattr(cls, name, None), 'dispatcher', None)
+        if isinstance(dispatcher, Dispatcher):
+            namespace[name] = wrap(dispatcher)
+    return type(cls.__name__, (cls,), namespace)
+
+def dynamic(dispatcher):
+    def ff(*args, **kw):
+        return dispatcher(*args, **kw)
+    return ff
+
+def counting(counter):
+    def wrap(dispatcher):
+        def ff(*args, **kw):
+            counter[0] += 1
+            return dispatcher(*args, **kw)
+        return ff
+    return wrap
+
+def measure(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main(size_kb=64, repeat=5):
+    ast, ok = LR1Parser(G).evaluate(lexer(generate_source(size_kb * 1024)))
+    assert ok, ast
+    collector = TypeCollector()
+    collector.visit(ast)
+    context = collector.context
+    TypeBuilder(context).visit(ast)
+    gatherer = InferenceGatherer(context)
+    scope = gatherer.visit(ast)
+    VariableResolver(scope).visit(ast)
+
+    def log(cls):
+        # The logger leaves the scope cursors where it stopped
+        cls(context).visit(ast, scope)
+        scope.reset()
+
+    runs = [
+        (TypeLogger, log),
+        (TypeInferencer, lambda cls: cls(context).visit(ast, scope)),
+        (TypeLinker, lambda cls: cls(context, gatherer.inference_graph).visit(ast, scope)),
+    ]
+    print(f"{'visitor':<16}{'visits':>10}{'dynamic (ms)':>14}{'static (ms)':>13}{'saved ns/visit':>16}")
+    for cls, run in runs:
+        counter = [0]
+        run(with_dispatch(cls, counting(counter)))
+        visits = counter[0]
+        baseline = with_dispatch(cls, dynamic)
+        slow = measure(lambda: run(baseline), repeat)
+        fast = measure(lambda: run(cls), repeat)
+        print(f"{cls.__name__:<16}{visits:>10}{slow * 1000:>14.1f}{fast * 1000:>13.1f}{(slow - fast) * 1e9 / visits:>16.1f}")
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:3]))
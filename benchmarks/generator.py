@@ -0,0 +1,89 @@
+"""
+Generates well typed Cool programs of a chosen shape.
+
+    python -m benchmarks.generator [classes] [depth] [methods] [auto_density] [nesting] [seed]
+
+Classes form inheritance chains `depth` classes long, each class defining
+`methods` methods that call the methods of their ancestors. A fraction
+`auto_density` of the parameters and return types is AUTO_TYPE, every one
+of them inferable as Int, and method bodies nest `nesting` expressions.
+"""
+import random
+import sys
+
+
+class ProgramGenerator:
+    def __init__(self, classes=20, depth=4, methods=3, auto_density=0.3, nesting=4, seed=0):
+        self.classes = classes
+        self.depth = max(1, depth)
+        self.methods = methods
+        self.auto_density = auto_density
+        self.nesting = nesting
+        self.random = random.Random(seed)
+
+    def parent(self, n):
+        return None if n % self.depth == 0 else n - 1
+
+    def ancestors(self, n):
+        result = []
+        parent = self.parent(n)
+        while parent is not None:
+            result.append(parent)
+            parent = self.parent(parent)
+        return result
+
+    def type_name(self):
+        return 'AUTO_TYPE' if self.random.random() < self.auto_density else 'Int'
+
+    def leaf(self, n):
+        return self.random.choice([ 'x', 'y', f'a{n}', str(self.random.randint(0, 99)) ])
+
+    def expression(self, n, k, level):
+        if level == 0:
+            return self.leaf(n)
+        inner = self.expression(n, k, level - 1)
+        # Methods of the ancestors and the earlier ones of this class
+        callees = [ (c, m) for c in self.ancestors(n) for m in range(self.methods) ]
+        callees += [ (n, m) for m in range(k) ]
+        shapes = [
+            lambda: f'({inner} + {self.leaf(n)})',
+            lambda: f'if {self.leaf(n)} < {self.leaf(n)} then {inner} else {self.leaf(n)} fi',
+            lambda: f'{{ {self.leaf(n)}; {inner}; }}',
+            lambda: f'let v{level} : Int <- {self.leaf(n)} in ({inner} * v{level})',
+            lambda: f'case {self.leaf(n)} of i : Int => {inner}; o : Object => 0; esac',
+        ]
+        if callees:
+            c, m = self.random.choice(callees)
+            shapes.append(lambda: f'm{c}_{m}({inner}, {self.leaf(n)})')
+        return self.random.choice(shapes)()
+
+    def class_source(self, n):
+        parent = self.parent(n)
+        header = f'class C{n}' + ('' if parent is None else f' inherits C{parent}')
+        features = [ f'    a{n} : Int <- {n};' ]
+        for k in range(self.methods):
+            body = self.expression(n, k, self.nesting)
+            features.append(
+                f'    m{n}_{k}(x : {self.type_name()}, y : Int) : {self.type_name()} {{\n'
+                f'        {body}\n'
+                f'    }};'
+            )
+        return header + ' {\n' + '\n'.join(features) + '\n};\n'
+
+    def generate(self):
+        chunks = [ self.class_source(n) for n in range(self.classes) ]
+        last = self.classes - 1
+        call = f'(new C{last}).m{last}_0(1, 2)' if self.classes and self.methods else '0'
+        chunks.append(
+            'class Main inherits IO {\n'
+            f'    main() : Object {{ out_int({call}) }};\n'
+            '};\n'
+        )
+        return '\n'.join(chunks)
+
+def generate_program(classes=20, depth=4, methods=3, auto_density=0.3, nesting=4, seed=0):
+    return ProgramGenerator(classes, depth, methods, auto_density, nesting, seed).generate()
+
+if __name__ == '__main__':
+    casts = [ int, int, int, float, int, int ]
+    print(generate_program(*(cast(arg) for cast, arg in zip(casts, sys.argv[1:7]))))
@@ -0,0 +1,52 @@
+"""
+Checks that tokenizing scales linearly with the size of the source.
+
+    python -m benchmarks.lexer [max_kb]
+
+Sources of growing size are generated by repeating a small class with fresh
+names; the time per KB should stay flat as the input grows.
+"""
+import sys
+import time
+
+from grammar import lexer
+
+CLASS_TEMPLATE = """
+class C{n} inherits IO {{
+    x{n} : Int <- {n};
+    s{n} : String <- "class number {n}";
+    f{n}(a : Int, b : AUTO_TYPE) : AUTO_TYPE {{
+        {{
+            if a < x{n} then b else a + x{n} * 2 fi;
+            let y : Int <- a in while 0 < y loop y <- y - 1 pool;
+            out_string(s{n});
+            case b of i : Int => i; o : Object => x{n}; esac;
+        }}
+    }};
+}};
+"""
+
+def generate_source(size):
+    chunks = []
+    total = 0
+    n = 0
+    while total < size:
+        chunk = CLASS_TEMPLATE.format(n=n)
+        chunks.append(chunk)
+        total += len(chunk)
+        n += 1
+    return ''.join(chunks)
+
+def main(max_kb=1024):
+    print(f"{'size (KB)':>10}{'tokens':>10}{'time (ms)':>12}{'us/KB':>10}")
+    size = 16
+    while size <= max_kb:
+        text = generate_source(size * 1024)
+        start = time.perf_counter()
+        tokens = lexer(text)
+        elapsed = time.perf_counter() - start
+        print(f"{size:>10}{len(tokens):>10}{elapsed * 1000:>12.1f}{elapsed * 1e6 / size:>10.1f}")
+        size *= 2
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1024)
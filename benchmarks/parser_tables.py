@@ -0,0 +1,66 @@
+"""
+Times the construction of the parsing tables for the Cool grammar.
+
+    python -m benchmarks.parser_tables [repeat]
+
+The legacy builder reproduces the `closure_lr1` fixpoint automaton that the
+integer-indexed `build_LR1_automaton` replaced, so both can be compared.
+"""
+import sys
+import time
+
+from cmp.tools.LR1_Parser import (
+    LALR1Parser, LR1Parser, build_LR1_automaton, closure_lr1,
+    compute_firsts, goto_lr1
+)
+from cmp.tools.Old.automata03 import State
+from cmp.pycompiler import Item
+from cmp.utils import ContainerSet
+from grammar import G
+
+
+def legacy_LR1_automaton(G):
+    firsts = compute_firsts(G)
+    firsts[G.EOF] = ContainerSet(G.EOF)
+
+    start = frozenset([Item(G.startSymbol.productions[0], 0, lookaheads=(G.EOF,))])
+    automaton = State(frozenset(closure_lr1(start, firsts)), True)
+    pending = [ start ]
+    visited = { start: automaton }
+    while pending:
+        current = pending.pop()
+        closure = closure_lr1(current, firsts)
+        for symbol in G.terminals + G.nonTerminals:
+            goto = goto_lr1(closure, symbol, just_kernel=True)
+            if not goto:
+                continue
+            try:
+                next_state = visited[goto]
+            except KeyError:
+                next_state = visited[goto] = State(frozenset(closure_lr1(goto, firsts)), True)
+                pending.append(goto)
+            visited[current].add_transition(symbol.Name, next_state)
+    return automaton
+
+def measure(name, fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    print(f"{name:<28}{best * 1000:>12.1f} ms")
+    return result
+
+def main(repeat=3):
+    augmented = G.AugmentedGrammar(True)
+    legacy = measure("legacy LR(1) automaton", lambda: legacy_LR1_automaton(augmented), repeat)
+    indexed = measure("indexed LR(1) automaton", lambda: build_LR1_automaton(augmented), repeat)
+    assert len(list(legacy)) == len(list(indexed))
+
+    lr1 = measure("LR1Parser tables", lambda: LR1Parser(G, cache_dir=None), repeat)
+    lalr = measure("LALR1Parser tables", lambda: LALR1Parser(G, cache_dir=None), repeat)
+    measure("LR1Parser cached tables", lambda: LR1Parser(G), repeat)
+    print(f"LR(1) action entries: {len(lr1.action)}, LALR(1) action entries: {len(lalr.action)}")
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 3)
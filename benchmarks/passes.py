@@ -0,0 +1,39 @@
+"""
+Compares running hook-based passes in one fused traversal against one
+traversal per pass.
+
+    python -m benchmarks.passes [size_kb] [repeat]
+"""
+import sys
+import time
+
+from benchmarks.lexer import generate_source
+from cmp.tools.LR1_Parser import LR1Parser
+from format_visitor import FormatVisitor
+from grammar import G, lexer
+from pass_manager import PassManager
+from type_collector_builder import TypeCollector
+
+
+def measure(parse, fuse, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        # TypeCollector reorders the declarations, so every run gets a new tree
+        ast = parse()
+        start = time.perf_counter()
+        PassManager([ FormatVisitor(), TypeCollector() ], fuse=fuse).run(ast)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main(size_kb=256, repeat=5):
+    tokens = lexer(generate_source(size_kb * 1024))
+    parser = LR1Parser(G)
+    parse = lambda: parser.evaluate(tokens)[0]
+
+    separate = measure(parse, False, repeat)
+    fused = measure(parse, True, repeat)
+    print(f"{'one traversal per pass':<28}{separate * 1000:>10.1f} ms")
+    print(f"{'fused traversal':<28}{fused * 1000:>10.1f} ms")
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,123 @@
+"""
+Times every stage of the Pipeline over generated programs of growing size.
+
+    python -m benchmarks.suite [--classes 10 40 160] [--depth 4] [--methods 3]
+                               [--auto-density 0.3] [--nesting 4] [--repeat 3]
+                               [--output FILE]
+
+Each program size is compiled `repeat` times and the fastest time of every
+stage kept; memory is measured in one more run under tracemalloc. Parsing
+alone is timed apart from the parser stage, which also builds the AST, so the
+cost of the AST can be told from the cost of the parse. A run that raises
+keeps the stages finished before the failure and records the error. The
+results are written as JSON, tagged with the current commit, to compare them
+between commits.
+"""
+import argparse
+import json
+import platform
+import subprocess
+import time
+
+from benchmarks.generator import generate_program
+from grammar import G, lexer
+from pipeline import Pipeline
+
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_once(pipeline, source):
+    """
+    Compiles `source`, returning None or the error that stopped the run.
+    The stage that failed is dropped from the profile; the earlier ones stay.
+    """
+    try:
+        pipeline(source)
+        return None
+    except Exception as err:
+        failed = pipeline.profiler.stages.pop()['stage'] if pipeline.profiler.stages else None
+        return f"{failed}: {type(err).__name__}: {err}"
+
+def measure(pipeline, source, repeat):
+    # Tracing allocations slows every stage down, so the memory figures come
+    # from a run of their own and the times from untraced runs
+    profiler = pipeline.profiler
+    profiler.memory = True
+    error = run_once(pipeline, source)
+    stages = { stage['stage']: dict(stage, seconds=float('inf')) for stage in profiler.stages }
+    profiler.memory = False
+    for _ in range(repeat):
+        run_once(pipeline, source)
+        for stage in profiler.stages:
+            best = stages.setdefault(stage['stage'], dict(stage))
+            best['seconds'] = min(best['seconds'], stage['seconds'])
+    profiler.memory = True
+
+    tokens = lexer(source)
+    parse = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        pipeline.parser(tokens)
+        parse = min(parse, time.perf_counter() - start)
+    if 'parser' in stages:
+        stages['parser']['parse_only_seconds'] = parse
+        stages['parser']['ast_seconds'] = max(0.0, stages['parser']['seconds'] - parse)
+    return list(stages.values()), error
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the compiler stages over generated programs.")
+    parser.add_argument('--classes', type=int, nargs='+', default=[ 10, 40, 160 ])
+    parser.add_argument('--depth', type=int, default=4)
+    parser.add_argument('--methods', type=int, default=3)
+    parser.add_argument('--auto-density', type=float, default=0.3)
+    parser.add_argument('--nesting', type=int, default=4)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', default='bench_results.json')
+    args = parser.parse_args(argv)
+
+    pipeline = Pipeline(G, profile=True)
+    results = []
+    for classes in args.classes:
+        params = {
+            'classes': classes,
+            'depth': args.depth,
+            'methods': args.methods,
+            'auto_density': args.auto_density,
+            'nesting': args.nesting,
+            'seed': args.seed,
+        }
+        source = generate_program(**params)
+        stages, error = measure(pipeline, source, args.repeat)
+        results.append({
+            'params': params,
+            'source_bytes': len(source),
+            'errors': len(pipeline.errors),
+            'failure': error,
+            'stages': stages,
+        })
+
+        print(f"classes={classes} ({len(source) / 1024:.1f} KB, {len(pipeline.errors)} errors)")
+        for stage in stages:
+            print(f"    {stage['stage']:<14}{stage['seconds'] * 1000:>10.2f} ms")
+        if error is not None:
+            print(f"    failed in {error}")
+
+    report = {
+        'commit': current_commit(),
+        'python': platform.python_version(),
+        'repeat': args.repeat,
+        'results': results,
+    }
+    with open(args.output, 'w', encoding='utf8') as file:
+        json.dump(report, file, indent=2)
+    print(f"Results written to {args.output}")
+
+if __name__ == '__main__':
+    main()
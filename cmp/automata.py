@@ -54,8 +54,7 @@ class State:
         closure = self.epsilon_closure
         start = State(tuple(closure), any(s.final for s in closure), formatter)
 
-        closures = [ closure ]
-        states = [ start ]
+        states = { frozenset(closure): start }
         pending = [ start ]
 
         while pending:
@@ -64,21 +63,21 @@ class State:
 
             for symbol in symbols:
                 move = self.move_by_state(symbol, *state.state)
-                closure = self.epsilon_closure_by_state(*move)
+                closure = frozenset(self.epsilon_closure_by_state(*move))
 
-                if closure not in closures:
-                    new_state = State(tuple(closure), any(s.final for s in closure), formatter)
-                    closures.append(closure)
-                    states.append(new_state)
+                try:
+                    new_state = states[closure]
+                except KeyError:
+                    new_state = states[closure] = State(tuple(closure), any(s.final for s in closure), formatter)
                     pending.append(new_state)
-                else:
-                    index = closures.index(closure)
-                    new_state = states[index]
 
                 state.add_transition(symbol, new_state)
 
         return start
 
+    def minimize(self, key=None, formatter=lambda x: str(x)):
+        return minimize_dfa(self, key, formatter)
+
     @staticmethod
     def from_nfa(nfa, get_states=False):
         states = []
@@ -100,15 +99,15 @@ class State:
 
     @staticmethod
     def epsilon_closure_by_state(*states):
-        closure = { state for state in states }
-
-        l = 0
-        while l != len(closure):
-            l = len(closure)
-            tmp = [s for s in closure]
-            for s in tmp:
-                for epsilon_state in s.epsilon_transitions:
-                        closure.add(epsilon_state)
+        closure = set(states)
+        pending = list(states)
+
+        while pending:
+            state = pending.pop()
+            for epsilon_state in state.epsilon_transitions:
+                if epsilon_state not in closure:
+                    closure.add(epsilon_state)
+                    pending.append(epsilon_state)
         return closure
 
     @property
@@ -197,6 +196,98 @@ class State:
     def write_to(self, fname):
         return self.graph().write_svg(fname)
 
+def minimize_dfa(start, key=None, formatter=lambda x: str(x)):
+    """
+    Hopcroft's algorithm. States start split by `key(state)` (by default whether
+    they are final and their tag), so states accepting different tokens are
+    never merged. Missing transitions go to an implicit dead state, which is
+    dropped from the result.
+    """
+    if key is None:
+        key = lambda state: (state.final, state.tag)
+
+    states = [ start ]
+    index = { id(start): 0 }
+    pending = [ start ]
+    while pending:
+        state = pending.pop()
+        for destinations in state.transitions.values():
+            for destination in destinations:
+                if id(destination) not in index:
+                    index[id(destination)] = len(states)
+                    states.append(destination)
+                    pending.append(destination)
+
+    dead = len(states)
+    symbols = { symbol for state in states for symbol in state.transitions }
+    inverse = { symbol: {} for symbol in symbols }
+    for i, state in enumerate(states):
+        for symbol in symbols:
+            destinations = state.transitions.get(symbol)
+            target = index[id(destinations[0])] if destinations else dead
+            inverse[symbol].setdefault(target, []).append(i)
+    for symbol in symbols:
+        inverse[symbol].setdefault(dead, []).append(dead)
+
+    groups = {}
+    for i, state in enumerate(states):
+        groups.setdefault(key(state), set()).add(i)
+    blocks = list(groups.values()) + [ { dead } ]
+    block_of = [ 0 ] * (dead + 1)
+    for b, block in enumerate(blocks):
+        for i in block:
+            block_of[i] = b
+
+    worklist = list(range(len(blocks)))
+    queued = set(worklist)
+    while worklist:
+        splitter = worklist.pop()
+        queued.discard(splitter)
+        splitter_states = list(blocks[splitter])
+        for symbol in symbols:
+            predecessors = {}
+            for target in splitter_states:
+                for source in inverse[symbol].get(target, ()):
+                    predecessors.setdefault(block_of[source], set()).add(source)
+
+            for b, inside in predecessors.items():
+                block = blocks[b]
+                if len(inside) == len(block):
+                    continue
+                outside = block - inside
+                blocks[b] = inside
+                blocks.append(outside)
+                new = len(blocks) - 1
+                for i in outside:
+                    block_of[i] = new
+                if b in queued:
+                    worklist.append(new)
+                    queued.add(new)
+                else:
+                    smaller = b if len(inside) <= len(outside) else new
+                    worklist.append(smaller)
+                    queued.add(smaller)
+
+    dead_block = block_of[dead]
+    minimized = {}
+    for b, block in enumerate(blocks):
+        if b == dead_block:
+            continue
+        members = sorted(block)
+        representative = states[members[0]]
+        new_state = type(start)(tuple(states[i] for i in members), representative.final, formatter)
+        new_state.tag = representative.tag
+        minimized[b] = new_state
+
+    for b, new_state in minimized.items():
+        representative = states[min(blocks[b])]
+        for symbol, destinations in representative.transitions.items():
+            target = block_of[index[id(destinations[0])]]
+            if target != dead_block:
+                new_state.add_transition(symbol, minimized[target])
+
+    return minimized[block_of[0]]
+
 def multiline_formatter(state):
     return '\n'.join(str(item) for item in state)
 
@@ -1,4 +1,3 @@
-import itertools as itt
 from collections import OrderedDict
 
 class SemanticError(Exception):
@@ -34,12 +33,21 @@ class Method:
             other.param_types == self.param_types
 
 class Type:
+    # Inherited-merged member tables, built by `freeze_tables`
+    _attribute_table = None
+    _method_table = None
+    _all_attributes = None
+    _all_methods = None
+
     def __init__(self, name:str):
         self.name = name
         self.attributes = []
         self.methods = []
         self.parent = None
         self.index = -1
+        self.context = None
+        self.type_id = None
+        self.interval = None
 
     def set_parent(self, parent):
         if self.parent is not None:
@@ -47,6 +55,8 @@ class Type:
         if parent.name in {"String", "Int", "Bool"}:
             raise SemanticError(f'{parent} type cannot be inherited.')
         self.parent = parent
+        if self.context is not None:
+            self.context.hierarchy_changed()
 
     def least_common_ancestor(self, other):
         this = self
@@ -54,6 +64,12 @@ class Type:
             return ErrorType()
             #raise SemanticError("Error Type detected while perfoming Join. Aborting.") 
 
+        context = this.context
+        if context is not None and getattr(other, 'context', None) is context:
+            common = context.lowest_common_ancestor(this, other)
+            if common is not None:
+                return common
+
         while this.index < other.index:
             other = other.parent
         while other.index < this.index:
@@ -76,6 +92,11 @@ class Type:
         return self.least_common_ancestor(other)
 
     def get_attribute(self, name:str):
+        if self._attribute_table is not None:
+            try:
+                return self._attribute_table[name]
+            except KeyError:
+                raise SemanticError(f'Attribute "{name}" is not defined in {self.name}.') from None
         try:
             return next(attr for attr in self.attributes if attr.name == name)
         except StopIteration:
@@ -92,11 +113,18 @@ class Type:
         except SemanticError:
             attribute = Attribute(name, typex)
             self.attributes.append(attribute)
+            if self.context is not None:
+                self.context.thaw_tables()
             return attribute
         else:
             raise SemanticError(f'Attribute "{name}" is already defined in {self.name}.')
 
     def get_method(self, name:str, local:bool = False):
+        if self._method_table is not None:
+            try:
+                return self._method_table[name]
+            except KeyError:
+                raise SemanticError(f'Method "{name}" is not defined in class {self.name}.') from None
         try:
             return next(method for method in self.methods if method.name == name)
         except StopIteration:
@@ -137,22 +165,75 @@ class Type:
 
         method = Method(name, param_names, param_types, return_type)
         self.methods.append(method)
+        if self.context is not None:
+            self.context.index_method(method, self)
+            self.context.thaw_tables()
         return method
 
     def all_attributes(self, clean=True):
+        if self._all_attributes is not None:
+            return self._all_attributes.values() if clean else OrderedDict(self._all_attributes)
         plain = OrderedDict() if self.parent is None else self.parent.all_attributes(False)
         for attr in self.attributes:
             plain[attr.name] = (attr, self)
         return plain.values() if clean else plain
 
     def all_methods(self, clean=True):
+        if self._all_methods is not None:
+            return self._all_methods.values() if clean else OrderedDict(self._all_methods)
         plain = OrderedDict() if self.parent is None else self.parent.all_methods(False)
         for method in self.methods:
             plain[method.name] = (method, self)
         return plain.values() if clean else plain
 
+    def freeze_tables(self):
+        """
+        Merges the members of this type and its ancestors into dict tables,
+        making every lookup a single access until a member or parent is
+        defined again. Types of cyclic hierarchies keep the slow lookups.
+        """
+        chain, seen, current = [], set(), self
+        while current is not None and current._method_table is None:
+            if id(current) in seen:
+                return
+            seen.add(id(current))
+            chain.append(current)
+            current = current.parent
+        for typex in reversed(chain):
+            typex._build_tables()
+
+    def _build_tables(self):
+        parent = self.parent
+        attributes = OrderedDict() if parent is None else OrderedDict(parent._all_attributes)
+        methods = OrderedDict() if parent is None else OrderedDict(parent._all_methods)
+        for attr in self.attributes:
+            attributes[attr.name] = (attr, self)
+        for method in self.methods:
+            methods[method.name] = (method, self)
+
+        # Lookups find the first local member with the name before the inherited ones
+        attribute_table = { name: attr for name, (attr, _) in attributes.items() }
+        attribute_table.update((attr.name, attr) for attr in reversed(self.attributes))
+        method_table = { name: method for name, (method, _) in methods.items() }
+        method_table.update((method.name, method) for method in reversed(self.methods))
+
+        self._all_attributes, self._all_methods = attributes, methods
+        self._attribute_table, self._method_table = attribute_table, method_table
+        if self.context is not None:
+            self.context._frozen = True
+
+    def thaw_tables(self):
+        self._attribute_table = self._method_table = None
+        self._all_attributes = self._all_methods = None
+
     def conforms_to(self, other):
-        return other.bypass() or self == other or self.parent is not None and self.parent.conforms_to(other)
+        if other.bypass():
+            return True
+        # Types numbered by the TypeCollector conform to the types whose
+        # preorder interval contains theirs
+        if self.interval is not None and other.interval is not None:
+            return other.interval[0] <= self.interval[0] <= other.interval[1]
+        return self == other or self.parent is not None and self.parent.conforms_to(other)
 
     def bypass(self):
         return False
@@ -187,7 +268,7 @@ class AutoType(Type):
     def  __init__(self, serial, head:list, type_set):
         Type.__init__(self, f"AUTO_TYPE({serial})")
         self.upper_limmit = head
-        self.type_set = set_from_dict(type_set) if isinstance(type_set, dict) else type_set
+        self.type_set = as_type_set(type_set.values() if isinstance(type_set, dict) else type_set)
         self.upper_global = None
         self.conditions_list = []
         self.conforms_list = []
@@ -197,7 +278,7 @@ class AutoType(Type):
         print("Total Disjoint Sets", len(self.upper_limmit), "Total types in set", len(self.type_set))
         print("Head Sets:", ", ".join([head.name for head in self.upper_limmit]))
         new_uppert_limmit = []
-        new_type_sets = set()
+        new_type_sets = empty_like(self.type_set)
         for i in range(len(self.upper_limmit)):
             old_upper = self.upper_limmit[i]
             for new_upper in pretenders:
@@ -238,7 +319,7 @@ class AutoType(Type):
         #self.update_type_set_from_conforms()
 
     def update_type_set_from_conforms(self):
-        intersect_set = set()
+        intersect_set = empty_like(self.type_set)
         for conform_set in self.conforms_list:
             intersect_set = intersect_set.union(conform_set)
         self.type_set = self.type_set.intersection(intersect_set)
@@ -258,16 +339,15 @@ class AutoType(Type):
                 continue
             new_heads = []
             lower_index = 2**32
-            for typex in self.type_set:
+            for typex in set_intersection(head, self.type_set):
                 if typex in visited:
                     continue
-                if typex.conforms_to(head):
-                    visited.add(typex)
-                    if typex.index < lower_index:
-                        new_heads = [typex]
-                        lower_index = typex.index
-                    elif typex.index == lower_index:
-                        new_heads.append(typex)
+                visited.add(typex)
+                if typex.index < lower_index:
+                    new_heads = [typex]
+                    lower_index = typex.index
+                elif typex.index == lower_index:
+                    new_heads.append(typex)
             total_new += new_heads
         self.upper_limmit = total_new
         print("New Upper Limit:", ", ".join([typex.name for typex in self.upper_limmit]),)
@@ -325,13 +405,131 @@ class Context:
         self.types = {}
         self.num_autotypes = 0
         self.type_tree = None
+        self.type_list = []
+        self._subtype_masks = None
+        self._euler_first = None
+        self._euler_tour = None
+        self._euler_depths = None
+        self._sparse_table = None
+        self._frozen = False
+        self._method_index = {}
 
     def create_type(self, name:str):
         if name in self.types:
             raise SemanticError(f'Type with the same name ({name}) already in context.')
         typex = self.types[name] = Type(name)
+        typex.context = self
+        typex.type_id = len(self.type_list)
+        self.type_list.append(typex)
+        self._subtype_masks = None
         return typex
 
+    def type_mask(self, types, strict=True):
+        """
+        Bitmask of `types` over the ids of this context. Types from elsewhere
+        make it return None, or are skipped when `strict` is False.
+        """
+        mask = 0
+        for typex in types:
+            if getattr(typex, 'context', None) is self:
+                mask |= 1 << typex.type_id
+            elif strict:
+                return None
+        return mask
+
+    def subtypes_mask(self, typex):
+        """Bitmask of the types of this context that conform to `typex`."""
+        if self._subtype_masks is None:
+            masks = [ 0 ] * len(self.type_list)
+            for child in self.type_list:
+                bit = 1 << child.type_id
+                current = child
+                while current is not None:
+                    masks[current.type_id] |= bit
+                    current = current.parent
+            self._subtype_masks = masks
+        return self._subtype_masks[typex.type_id]
+
+    def hierarchy_changed(self):
+        self._subtype_masks = None
+        self.thaw_tables()
+
+    def freeze_tables(self):
+        """Builds the member tables of every type, see `Type.freeze_tables`."""
+        for typex in self.type_list:
+            typex.freeze_tables()
+
+    def thaw_tables(self):
+        if self._frozen:
+            for typex in self.type_list:
+                typex.thaw_tables()
+            self._frozen = False
+
+    def build_lca_index(self, root="Object"):
+        """
+        Indexes `type_tree` for lowest common ancestor queries: an Euler tour
+        of the tree from `root` plus a sparse table holding, for every power
+        of two, the shallowest type of each window of the tour.
+        """
+        tour, depths, first = [], [], {}
+        visited = { root }
+        root_type = self.types[root]
+        first[root_type.type_id] = 0
+        tour.append(root_type)
+        depths.append(0)
+        stack = [ (root_type, 0, iter(self.type_tree.get(root, ()))) ]
+        while stack:
+            typex, depth, children = stack[-1]
+            child = next(children, None)
+            if child is None:
+                stack.pop()
+                if stack:
+                    tour.append(stack[-1][0])
+                    depths.append(stack[-1][1])
+                continue
+            if child in visited or child not in self.types:
+                continue
+            visited.add(child)
+            child_type = self.types[child]
+            first[child_type.type_id] = len(tour)
+            tour.append(child_type)
+            depths.append(depth + 1)
+            stack.append((child_type, depth + 1, iter(self.type_tree.get(child, ()))))
+
+        table = [ list(range(len(tour))) ]
+        width = 1
+        while 2 * width <= len(tour):
+            previous = table[-1]
+            row = []
+            for i in range(len(tour) - 2 * width + 1):
+                left, right = previous[i], previous[i + width]
+                row.append(left if depths[left] <= depths[right] else right)
+            table.append(row)
+            width *= 2
+
+        self._euler_first = first
+        self._euler_tour = tour
+        self._euler_depths = depths
+        self._sparse_table = table
+
+    def lowest_common_ancestor(self, this, other):
+        """
+        Lowest common ancestor of two types of the indexed tree in constant
+        time, or None when the index does not know either of them.
+        """
+        if self._euler_first is None:
+            return None
+        try:
+            left, right = self._euler_first[this.type_id], self._euler_first[other.type_id]
+        except KeyError:
+            return None
+        if left > right:
+            left, right = right, left
+        level = (right - left + 1).bit_length() - 1
+        row, depths = self._sparse_table[level], self._euler_depths
+        a, b = row[left], row[right - (1 << level) + 1]
+        return self._euler_tour[a if depths[a] <= depths[b] else b]
+
     def get_type(self, name:str, selftype=True, autotype=True):
         if selftype and name == "SELF_TYPE":
             return SelfType()
@@ -343,7 +541,35 @@ class Context:
         except KeyError:
             raise SemanticError(f'Type "{name}" is not defined.')
     
+    def index_method(self, method, typex):
+        key = (method.name, len(method.param_names))
+        self._method_index.setdefault(key, []).append((method, typex))
+
     def get_method_by_name(self, name:str, args:int) -> list:
+        """
+        Methods called `name` taking `args` arguments, each with the topmost
+        type below Object defining it in its branch, in `type_tree` preorder.
+        """
+        object_type = self.types.get("Object")
+        if object_type is None or object_type.interval is None:
+            return self._search_method_by_name(name, args)
+
+        # Definers sorted by preorder position; those inside the interval of
+        # the last one kept inherit the method from a reported type
+        definers = [
+            (method, typex) for method, typex in self._method_index.get((name, args), ())
+            if typex.interval is not None and typex is not object_type
+        ]
+        definers.sort(key=lambda pair: pair[1].interval[0])
+        results, end = [], -1
+        for method, typex in definers:
+            start, stop = typex.interval
+            if start > end:
+                results.append((method, typex))
+                end = stop
+        return results
+
+    def _search_method_by_name(self, name:str, args:int) -> list:
         def dfs(root:str, results:list):
             try:
                 for typex in self.type_tree[root]:
@@ -376,9 +602,12 @@ class VariableInfo:
 class Scope:
     def __init__(self, parent=None):
         self.locals = []
+        self.names = {}
         self.parent = parent
         self.children = []
         self.index = 0 if parent is None else len(parent)
+        self.depth = 0 if parent is None else parent.depth + 1
+        self.ancestors = [self] if parent is None else parent.ancestors + [self]
         self.current_child = -1
 
     def __len__(self):
@@ -391,24 +620,50 @@ class Scope:
 
     def define_variable(self, vname, vtype):
         info = VariableInfo(vname, vtype)
+        # Lookups find the first local with the name
+        self.names.setdefault(vname, len(self.locals))
         self.locals.append(info)
         return info
 
     def find_variable(self, vname, index=None):
-        locals = self.locals if index is None else itt.islice(self.locals, index)
-        try:
-            return next(x for x in locals if x.name == vname)
-        except StopIteration:
-            try:
-                return self.parent.find_variable(vname, self.index)# if self.parent else None
-            except AttributeError:
-                return None
+        scope = self
+        while scope is not None:
+            slot = scope.names.get(vname)
+            if slot is not None and (index is None or slot < index):
+                return scope.locals[slot]
+            index, scope = scope.index, scope.parent
+        return None
+
+    def resolve(self, vname):
+        """
+        Address of the variable `find_variable` finds from this scope: this
+        scope, the depth of the scope defining the variable and its slot
+        there, or None.
+        """
+        scope, index = self, None
+        while scope is not None:
+            slot = scope.names.get(vname)
+            if slot is not None and (index is None or slot < index):
+                return self, scope.depth, slot
+            index, scope = scope.index, scope.parent
+        return None
+
+    def get_variable(self, vname, address):
+        """
+        Reads `vname` straight from an address given by `resolve`. Only an
+        address resolved from this very scope is trusted; any other, or a
+        missing one, falls back to `find_variable`.
+        """
+        if address is not None and address[0] is self:
+            _, depth, slot = address
+            return self.ancestors[depth].locals[slot]
+        return self.find_variable(vname)
 
     def is_defined(self, vname):
         return self.find_variable(vname) is not None
 
     def is_local(self, vname):
-        return any(True for x in self.locals if x.name == vname)
+        return vname in self.names
     
     def next_child(self):
         self.current_child += 1
@@ -429,6 +684,8 @@ class Scope:
         
 
 def set_intersection(parent, type_set) -> set:
+    if isinstance(type_set, TypeSet) and getattr(parent, 'context', None) is type_set.context:
+        return TypeSet(type_set.context, type_set.mask & type_set.context.subtypes_mask(parent))
     set_result = set()
     for typex in type_set:
         if typex.conforms_to(parent):
@@ -439,4 +696,185 @@ def set_from_dict(types:dict):
     type_set = set()
     for typex in types:
         type_set.add(types[typex])
-    return type_set
\ No newline at end of file
+    return type_set
+
+class TypeSet:
+    """
+    Set of the types of a `Context` stored as a bitmask over their ids. It
+    behaves as a mutable `set` of `Type`s; operations with another `TypeSet`
+    of the same context are single integer operations. Unions and symmetric
+    differences with types from elsewhere fall back to a plain `set`, and
+    adding such types in place raises a SemanticError. In-place operators
+    change the set itself, so every reference to it sees the result.
+    """
+    __slots__ = ('context', 'mask')
+
+    def __init__(self, context, mask=0):
+        self.context = context
+        self.mask = mask
+
+    def _mask_of(self, other, strict=True):
+        if isinstance(other, TypeSet) and other.context is self.context:
+            return other.mask
+        return self.context.type_mask(other, strict)
+
+    def __contains__(self, typex):
+        return getattr(typex, 'context', None) is self.context and bool(self.mask >> typex.type_id & 1)
+
+    def __iter__(self):
+        type_list = self.context.type_list
+        mask = self.mask
+        while mask:
+            low = mask & -mask
+            yield type_list[low.bit_length() - 1]
+            mask ^= low
+
+    def __len__(self):
+        return bin(self.mask).count('1')
+
+    def __bool__(self):
+        return self.mask != 0
+
+    def __eq__(self, other):
+        if isinstance(other, TypeSet):
+            return self.context is other.context and self.mask == other.mask
+        if isinstance(other, (set, frozenset)):
+            return set(self) == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def copy(self):
+        return TypeSet(self.context, self.mask)
+
+    def union(self, *others):
+        mask = self.mask
+        for other in others:
+            other_mask = self._mask_of(other)
+            if other_mask is None:
+                return set(self).union(*others)
+            mask |= other_mask
+        return TypeSet(self.context, mask)
+
+    def intersection(self, *others):
+        mask = self.mask
+        for other in others:
+            mask &= self._mask_of(other, strict=False)
+        return TypeSet(self.context, mask)
+
+    def difference(self, *others):
+        mask = self.mask
+        for other in others:
+            mask &= ~self._mask_of(other, strict=False)
+        return TypeSet(self.context, mask)
+
+    def symmetric_difference(self, other):
+        other_mask = self._mask_of(other)
+        if other_mask is None:
+            return set(self).symmetric_difference(other)
+        return TypeSet(self.context, self.mask ^ other_mask)
+
+    def isdisjoint(self, other):
+        return self.mask & self._mask_of(other, strict=False) == 0
+
+    def issubset(self, other):
+        other_mask = self._mask_of(other, strict=False)
+        return self.mask & ~other_mask == 0
+
+    def issuperset(self, other):
+        other_mask = self._mask_of(other)
+        return other_mask is not None and other_mask & ~self.mask == 0
+
+    def add(self, typex):
+        if getattr(typex, 'context', None) is not self.context:
+            raise SemanticError(f'Type {typex.name} does not belong to this context.')
+        self.mask |= 1 << typex.type_id
+
+    def remove(self, typex):
+        if typex not in self:
+            raise KeyError(typex)
+        self.mask &= ~(1 << typex.type_id)
+
+    def discard(self, typex):
+        if typex in self:
+            self.mask &= ~(1 << typex.type_id)
+
+    def pop(self):
+        if not self.mask:
+            raise KeyError('pop from an empty TypeSet')
+        low = self.mask & -self.mask
+        self.mask ^= low
+        return self.context.type_list[low.bit_length() - 1]
+
+    def update(self, *others):
+        result = self.union(*others)
+        if not isinstance(result, TypeSet):
+            raise SemanticError('Types outside the context cannot join the set.')
+        self.mask = result.mask
+
+    def intersection_update(self, *others):
+        self.mask = self.intersection(*others).mask
+
+    def difference_update(self, *others):
+        self.mask = self.difference(*others).mask
+
+    def symmetric_difference_update(self, other):
+        result = self.symmetric_difference(other)
+        if not isinstance(result, TypeSet):
+            raise SemanticError('Types outside the context cannot join the set.')
+        self.mask = result.mask
+
+    def clear(self):
+        self.mask = 0
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def __iand__(self, other):
+        self.intersection_update(other)
+        return self
+
+    def __isub__(self, other):
+        self.difference_update(other)
+        return self
+
+    def __ixor__(self, other):
+        self.symmetric_difference_update(other)
+        return self
+
+    def __rsub__(self, other):
+        return { typex for typex in other if typex not in self }
+
+    def __lt__(self, other):
+        return self.issubset(other) and len(self) < len(other)
+
+    def __gt__(self, other):
+        return self.issuperset(other) and len(self) > len(other)
+
+    __or__ = __ror__ = union
+    __and__ = __rand__ = intersection
+    __xor__ = __rxor__ = symmetric_difference
+    __sub__ = difference
+    __le__ = issubset
+    __ge__ = issuperset
+
+    def __repr__(self):
+        return '{' + ', '.join(typex.name for typex in self) + '}'
+
+def as_type_set(types):
+    """
+    Turns a collection of types into a `TypeSet` when all of them belong to
+    the same context, and leaves it untouched otherwise.
+    """
+    if isinstance(types, TypeSet):
+        return types
+    listed = list(types)
+    context = next((typex.context for typex in listed if getattr(typex, 'context', None) is not None), None)
+    mask = None if context is None else context.type_mask(listed)
+    if mask is None:
+        return types if isinstance(types, (set, frozenset)) else set(listed)
+    return TypeSet(context, mask)
+
+def empty_like(type_set):
+    return TypeSet(type_set.context) if isinstance(type_set, TypeSet) else set()
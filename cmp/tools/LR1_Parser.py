@@ -1,8 +1,11 @@
+import os
+
 from cmp.pycompiler import Grammar, Item
 from cmp.utils import ContainerSet
-from cmp.tools.shift_reduce_parser import ShiftReduceParser
+from cmp.tools.json_store import load_or_build
+from cmp.tools.shift_reduce_parser import ShiftReduceParser, grammar_fingerprint
 
-from cmp.tools.Old.grammar import compute_firsts, compute_local_firsts
+from cmp.tools.Old.grammar import compute_local_firsts
 from cmp.tools.Old.automata03 import State, multiline_formatter
 
 
@@ -60,52 +63,236 @@ def goto_lr1(items, symbol, firsts=None, just_kernel=False):
             xlist.append(nextItem)
     return frozenset(xlist) if just_kernel else closure_lr1(items, firsts)
 
+class IndexedGrammar:
+    """
+    Integer view of an augmented grammar used to build LR(1) automata.
+    An item is a `(production, dot)` pair of ints mapped to the bitset of its
+    lookaheads, where bit `i` stands for `self.terminals[i]`.
+    """
+    def __init__(self, G):
+        self.G = G
+        self.terminals = G.terminals + [G.EOF]
+        self.nonterminals = G.nonTerminals
+        self.symbols = G.terminals + G.nonTerminals
+        self.productions = G.Productions
+        terminal_index = { t: i for i, t in enumerate(self.terminals) }
+        nonterminal_index = { nt: i for i, nt in enumerate(self.nonterminals) }
+        symbol_index = { symbol: i for i, symbol in enumerate(self.symbols) }
+
+        # Right hand sides as tuples of (is_terminal, index, symbol_index)
+        self.rights = []
+        self.by_left = [ [] for _ in self.nonterminals ]
+        for p, production in enumerate(self.productions):
+            right = tuple(
+                (symbol.IsTerminal, terminal_index[symbol] if symbol.IsTerminal else nonterminal_index[symbol], symbol_index[symbol])
+                for symbol in production.Right
+            )
+            self.rights.append(right)
+            self.by_left[nonterminal_index[production.Left]].append(p)
+
+        firsts = [0] * len(self.nonterminals)
+        nullable = [False] * len(self.nonterminals)
+        changed = True
+        while changed:
+            changed = False
+            for p, right in enumerate(self.rights):
+                left = nonterminal_index[self.productions[p].Left]
+                first, is_nullable = self._sequence_first(right, firsts, nullable)
+                if first | firsts[left] != firsts[left] or (is_nullable and not nullable[left]):
+                    firsts[left] |= first
+                    nullable[left] = nullable[left] or is_nullable
+                    changed = True
+
+        # FIRST and nullability of every suffix right[dot:] of every production
+        self.suffixes = []
+        for right in self.rights:
+            suffixes = [ (0, True) ] * (len(right) + 1)
+            for dot in range(len(right) - 1, -1, -1):
+                is_terminal, index, _ = right[dot]
+                first, is_nullable = suffixes[dot + 1]
+                if is_terminal:
+                    suffixes[dot] = (1 << index, False)
+                elif nullable[index]:
+                    suffixes[dot] = (firsts[index] | first, is_nullable)
+                else:
+                    suffixes[dot] = (firsts[index], False)
+            self.suffixes.append(suffixes)
+
+        self.start = self.productions.index(G.startSymbol.productions[0])
+        self.eof = 1 << terminal_index[G.EOF]
+        self._lookaheads = {}
+
+    @staticmethod
+    def _sequence_first(right, firsts, nullable):
+        first = 0
+        for is_terminal, index, _ in right:
+            if is_terminal:
+                return first | (1 << index), False
+            first |= firsts[index]
+            if not nullable[index]:
+                return first, False
+        return first, True
+
+    def closure(self, kernel):
+        items = dict(kernel)
+        pending = list(items)
+        rights, suffixes, by_left = self.rights, self.suffixes, self.by_left
+        while pending:
+            p, dot = pending.pop()
+            right = rights[p]
+            if dot == len(right) or right[dot][0]:
+                continue
+            first, is_nullable = suffixes[p][dot + 1]
+            if is_nullable:
+                first |= items[p, dot]
+            for q in by_left[right[dot][1]]:
+                old = items.get((q, 0), 0)
+                if old | first != old:
+                    items[q, 0] = old | first
+                    pending.append((q, 0))
+        return items
+
+    def goto_kernels(self, closure):
+        kernels = {}
+        rights = self.rights
+        for (p, dot), lookaheads in closure.items():
+            right = rights[p]
+            if dot < len(right):
+                kernels.setdefault(right[dot][2], {})[p, dot + 1] = lookaheads
+        return kernels
+
+    def to_items(self, closure):
+        return frozenset(
+            Item(self.productions[p], dot, self.decode(lookaheads))
+            for (p, dot), lookaheads in closure.items()
+        )
+
+    def decode(self, lookaheads):
+        try:
+            return self._lookaheads[lookaheads]
+        except KeyError:
+            terminals = tuple(t for i, t in enumerate(self.terminals) if lookaheads >> i & 1)
+            self._lookaheads[lookaheads] = terminals
+            return terminals
+
 def build_LR1_automaton(G):
     assert len(G.startSymbol.productions) == 1, 'Grammar must be augmented'
-    
-    firsts = compute_firsts(G)
-    firsts[G.EOF] = ContainerSet(G.EOF)
-    
-    start_production = G.startSymbol.productions[0]
-    start_item = Item(start_production, 0, lookaheads=(G.EOF,))
-    start = frozenset([start_item])
-    
-    closure = closure_lr1(start, firsts)
-    automaton = State(frozenset(closure), True)
-    
-    pending = [ start ]
-    visited = { start: automaton }
-    
+
+    grammar = IndexedGrammar(G)
+    start = frozenset([ (grammar.start, 0, grammar.eof) ])
+
+    closures = [ grammar.closure({ (grammar.start, 0): grammar.eof }) ]
+    visited = { start: 0 }
+    transitions = [ {} ]
+    pending = [ 0 ]
+
     while pending:
         current = pending.pop()
-        current_state = visited[current]
-        
-        closure = closure_lr1(current, firsts)
-        for symbol in G.terminals + G.nonTerminals:
-            # Your code here!!! (Get/Build `next_state`)
-            goto = goto_lr1(closure, symbol, just_kernel = True)
-            
-            if not goto:
-                continue
+        for symbol, kernel in grammar.goto_kernels(closures[current]).items():
+            key = frozenset((p, dot, lookaheads) for (p, dot), lookaheads in kernel.items())
             try:
-                next_state = visited[goto]
+                target = visited[key]
             except KeyError:
-                closure2 = closure_lr1(goto, firsts)
-                next_state = visited[goto] = State(frozenset(closure2),  True)
-                pending.append(goto)
-            
-            current_state.add_transition(symbol.Name, next_state)
-    
+                target = visited[key] = len(closures)
+                closures.append(grammar.closure(kernel))
+                transitions.append({})
+                pending.append(target)
+            transitions[current][symbol] = target
+
+    return _build_states(grammar, closures, transitions)
+
+def build_LALR1_automaton(G):
+    assert len(G.startSymbol.productions) == 1, 'Grammar must be augmented'
+
+    grammar = IndexedGrammar(G)
+
+    # States are identified by the centers of their kernels; every state keeps
+    # the union of the lookaheads that reached each of its kernel centers.
+    start = frozenset([ (grammar.start, 0) ])
+    kernels = [ { (grammar.start, 0): grammar.eof } ]
+    closures = [ None ]
+    visited = { start: 0 }
+    transitions = [ {} ]
+    pending = [ 0 ]
+    queued = { 0 }
+
+    while pending:
+        current = pending.pop()
+        queued.discard(current)
+        closures[current] = grammar.closure(kernels[current])
+
+        for symbol, kernel in grammar.goto_kernels(closures[current]).items():
+            core = frozenset(kernel)
+            try:
+                target = visited[core]
+                lookaheads = kernels[target]
+                changed = False
+                for center, looks in kernel.items():
+                    if lookaheads[center] | looks != lookaheads[center]:
+                        lookaheads[center] |= looks
+                        changed = True
+            except KeyError:
+                target = visited[core] = len(kernels)
+                kernels.append(dict(kernel))
+                closures.append(None)
+                transitions.append({})
+                changed = True
+
+            if changed and target not in queued:
+                pending.append(target)
+                queued.add(target)
+            transitions[current][symbol] = target
+
+    return _build_states(grammar, closures, transitions)
+
+def _build_states(grammar, closures, transitions):
+    states = [ State(grammar.to_items(closure), True) for closure in closures ]
+    for state, symbols in zip(states, transitions):
+        for symbol, target in symbols.items():
+            state.add_transition(grammar.symbols[symbol].Name, states[target])
+
+    automaton = states[0]
     automaton.set_formatter(multiline_formatter)
     return automaton
 
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.lr1_cache')
+
 class LR1Parser(ShiftReduceParser):
+    def __init__(self, G, verbose=False, cache_dir=CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.augmented = None
+        self._automaton = None
+        super().__init__(G, verbose)
+
+    @property
+    def automaton(self):
+        """
+        The automaton the tables were built from. Tables loaded from the cache
+        come without it, so it is built, and its states numbered, on first use.
+        """
+        if self._automaton is None:
+            if self.augmented is None:
+                self.augmented = self.G.AugmentedGrammar(True)
+            self._automaton = self._build_automaton(self.augmented)
+            for i, node in enumerate(self._automaton):
+                node.idx = i
+        return self._automaton
+
     def _build_parsing_table(self):
-        G = self.G.AugmentedGrammar(True)
+        fingerprint = None if self.cache_dir is None else grammar_fingerprint(self.G, type(self).__name__)
+        load_or_build(
+            self.cache_dir, fingerprint,
+            lambda path: self.load_tables(path, fingerprint),
+            self._build_lr1_table,
+            lambda path: self.save_tables(path, fingerprint),
+        )
+
+    def _build_lr1_table(self):
+        G = self.augmented = self.G.AugmentedGrammar(True)
         self.conflictType = dict()
-        self.automaton = build_LR1_automaton(G)
+        self._automaton = self._build_automaton(G)
         
-        automaton = self.automaton
+        automaton = self._automaton
         for i, node in enumerate(automaton):
             if self.verbose: print(i, '\t', '\n\t '.join(str(x) for x in node.state), '\n')
             node.idx = i
@@ -131,3 +318,42 @@ class LR1Parser(ShiftReduceParser):
                         self._register(self.action, k, (self.SHIFT, next_sym_idx), self.conflictType)
                     else:
                         self._register(self.goto, k, next_sym_idx, self.conflictType)
+
+    def _build_automaton(self, G):
+        return build_LR1_automaton(G)
+
+class LALR1Parser(LR1Parser):
+    MERGE_CONFLICT = 'REDUCE-REDUCE (LALR)'
+
+    def _build_automaton(self, G):
+        return build_LALR1_automaton(G)
+
+    def _build_lr1_table(self):
+        super()._build_lr1_table()
+        conflicts = [ key for key, kind in self.conflictType.items() if kind == 'REDUCE-REDUCE' ]
+        if not conflicts:
+            return
+
+        # Reduce-reduce conflicts can appear when merging states with equal cores.
+        # Only those absent from every canonical LR(1) state sharing the core are
+        # reported as introduced by the merge. The canonical automaton must come
+        # from the same augmented grammar, whose S' production the cores hold.
+        canonical = set()
+        for node in build_LR1_automaton(self.augmented):
+            core = frozenset(item.Center() for item in node.state)
+            reductions = {}
+            for item in node.state:
+                if item.IsReduceItem:
+                    for look in item.lookaheads:
+                        reductions.setdefault(look, set()).add(item.production)
+            canonical.update((core, look) for look, productions in reductions.items() if len(productions) > 1)
+
+        cores = { node.idx: frozenset(item.Center() for item in node.state) for node in self.automaton }
+        for idx, look in conflicts:
+            if (cores[idx], look) not in canonical:
+                self.conflictType[idx, look] = self.MERGE_CONFLICT
+                if self.verbose: print(f"LALR merge introduced a reduce-reduce conflict in state {idx} on {look}")
+
+    @property
+    def merge_conflicts(self):
+        return [ key for key, kind in self.conflictType.items() if kind == self.MERGE_CONFLICT ]
@@ -1,4 +1,9 @@
+import hashlib
+import os
+
 import pydot
+from cmp.automata import minimize_dfa
+from cmp.tools.json_store import load_or_build, read_json, write_json
 from cmp.utils import Token
 
 class State:
@@ -52,8 +57,7 @@ class State:
         closure = self.epsilon_closure
         start = State(tuple(closure), any(s.final for s in closure), formatter)
 
-        closures = [ closure ]
-        states = [ start ]
+        states = { frozenset(closure): start }
         pending = [ start ]
 
         while pending:
@@ -62,21 +66,21 @@ class State:
 
             for symbol in symbols:
                 move = self.move_by_state(symbol, *state.state)
-                closure = self.epsilon_closure_by_state(*move)
+                closure = frozenset(self.epsilon_closure_by_state(*move))
 
-                if closure not in closures:
-                    new_state = State(tuple(closure), any(s.final for s in closure), formatter)
-                    closures.append(closure)
-                    states.append(new_state)
+                try:
+                    new_state = states[closure]
+                except KeyError:
+                    new_state = states[closure] = State(tuple(closure), any(s.final for s in closure), formatter)
                     pending.append(new_state)
-                else:
-                    index = closures.index(closure)
-                    new_state = states[index]
 
                 state.add_transition(symbol, new_state)
 
         return start
 
+    def minimize(self, key=None, formatter=lambda x: str(x)):
+        return minimize_dfa(self, key, formatter)
+
     @staticmethod
     def from_nfa(nfa, get_states=False):
         states = []
@@ -98,15 +102,15 @@ class State:
 
     @staticmethod
     def epsilon_closure_by_state(*states):
-        closure = { state for state in states }
-
-        l = 0
-        while l != len(closure):
-            l = len(closure)
-            tmp = [s for s in closure]
-            for s in tmp:
-                for epsilon_state in s.epsilon_transitions:
-                        closure.add(epsilon_state)
+        closure = set(states)
+        pending = list(states)
+
+        while pending:
+            state = pending.pop()
+            for epsilon_state in state.epsilon_transitions:
+                if epsilon_state not in closure:
+                    closure.add(epsilon_state)
+                    pending.append(epsilon_state)
         return closure
 
     @property
@@ -203,11 +207,56 @@ def lr0_formatter(state):
     except TypeError:
         return str(state)[:-4]
 
+LEXER_FORMAT_VERSION = 1
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.lexer_cache')
+
+class LexerError(Exception):
+    def __init__(self, char, position):
+        super().__init__(f"Unexpected character {char!r} at position {position}.")
+        self.char = char
+        self.position = position
+
+    @property
+    def text(self):
+        return self.args[0]
+
 class Lexer:
-    def __init__(self, table, eof):
+    def __init__(self, table, eof, cache_dir=CACHE_DIR):
         self.eof = eof
-        self.regexs = self._build_regexs(table)
-        self.automaton = self._build_automaton()
+        self.token_table = table
+        self.token_types = [ token_type for token_type, _ in table ]
+        self.cache_dir = cache_dir
+        self._regexs = None
+        self._automaton = None
+        self.table = None
+
+    # A table loaded from the cache comes without the automata it was
+    # compiled from, so they are built on first use
+
+    @property
+    def regexs(self):
+        if self._regexs is None:
+            self._regexs = self._build_regexs(self.token_table)
+        return self._regexs
+
+    @property
+    def automaton(self):
+        if self._automaton is None:
+            self._automaton = self._build_automaton()
+        return self._automaton
+
+    def _build(self):
+        # Nothing is compiled until the first text is tokenized
+        fingerprint = None if self.cache_dir is None else lexer_fingerprint(self.token_table)
+        load_or_build(
+            self.cache_dir, fingerprint,
+            lambda path: self.load_table(path, fingerprint),
+            self._build_table,
+            lambda path: self.save_table(path, fingerprint),
+        )
+
+    def _build_table(self):
+        self._compile_automaton()
     
     def _build_regexs(self, table):
         regexs = []
@@ -217,50 +266,126 @@ class Lexer:
                 if i.final:
                     i.tag = (n, token_type)
             
-            regexs.append(automaton)
+            regexs.append(automaton.minimize())
         return regexs
     
     def _build_automaton(self):
         start = State('start')
         for automaton in self.regexs:
             start.add_epsilon_transition(automaton)
-        return start.to_deterministic()
+        automaton = start.to_deterministic()
+        for state in automaton:
+            tags = [ st.tag for st in state.state if st.final ]
+            state.tag = min(tags, key=lambda tag: tag[0]) if tags else None
+        return automaton.minimize(key=lambda state: state.tag)
     
         
-    def _walk(self, string):
-        state = self.automaton
-        final = state if state.final else None
-        final_lex = lex = ''
-        
-        for symbol in string:
-            try:
-                state = state[symbol][0]
-                lex += symbol
-                if state.final:
-                    final = state
-                    final_lex = lex
-            except:
-                break
-        return final_lex, final
-    
+    def _compile_automaton(self):
+        states = list(self.automaton)
+        index = { id(state): i for i, state in enumerate(states) }
+
+        # Characters with the same transitions in every state share a class.
+        # Class 0 stands for every character the automaton does not know.
+        columns = {}
+        for i, state in enumerate(states):
+            for symbol, destinations in state.transitions.items():
+                columns.setdefault(symbol, []).append((i, index[id(destinations[0])]))
+        classes = {}
+        char_classes = {}
+        for symbol, column in columns.items():
+            char_classes[symbol] = classes.setdefault(tuple(column), len(classes) + 1)
+
+        # Rows are addressed by their offset in the flat table, so following a
+        # transition is a single index: `table[row + char_class]`.
+        width = len(classes) + 1
+        table = [ -1 ] * (len(states) * width)
+        for column, char_class in classes.items():
+            for origin, destination in column:
+                table[origin * width + char_class] = destination * width
+
+        accepting = [ None ] * len(table)
+        for i, state in enumerate(states):
+            if state.tag is not None:
+                accepting[i * width] = state.tag[0]
+
+        self.char_classes = char_classes
+        self.table = table
+        self.width = width
+        self.accepting = accepting
+
+    def save_table(self, path, fingerprint):
+        data = {
+            'version': LEXER_FORMAT_VERSION,
+            'fingerprint': fingerprint,
+            'char_classes': self.char_classes,
+            'width': self.width,
+            'table': self.table,
+            'accepting': { i: tag for i, tag in enumerate(self.accepting) if tag is not None },
+        }
+        write_json(path, data)
+
+    def load_table(self, path, fingerprint):
+        data = read_json(path, LEXER_FORMAT_VERSION, fingerprint)
+        if data is None:
+            return False
+
+        try:
+            table = data['table']
+            accepting = [ None ] * len(table)
+            for i, tag in data['accepting'].items():
+                accepting[int(i)] = tag
+            char_classes, width = data['char_classes'], data['width']
+        except (KeyError, IndexError, ValueError, AttributeError):
+            return False
+
+        self.char_classes = char_classes
+        self.table = table
+        self.width = width
+        self.accepting = accepting
+        return True
+
     def _tokenize(self, text):
-        final = None
-        consumedText = None
+        if self.table is None:
+            self._build()
+        table, accepting = self.table, self.accepting
+        classes, token_types = self.char_classes, self.token_types
+        codes = [ classes.get(char, 0) for char in text ]
+        codes.append(0)
+        start = 0
+        length = len(text)
         
-        while len(text) > 0:
-            final_lex, final= self._walk(text)
-            minPrior = 1e9
-            finalfinal = None
-            for st in final.state:
-                if st.final:
-                    n, _type = st.tag
-                    if  n < minPrior:
-                        minPrior = n
-                        finalfinal = st
-            yield final_lex, finalfinal.tag[1]
-            text = text[len(final_lex):]#Funcion magica que quita me ve achicando el texto
+        # Longest match: every character costs one lookup in the flat table and
+        # the sentinel class 0 at the end of `codes` stops the last token.
+        while start < length:
+            row = 0
+            tag = accepting[0]
+            end = cursor = start
+            while True:
+                row = table[row + codes[cursor]]
+                if row < 0:
+                    break
+                cursor += 1
+                if accepting[row] is not None:
+                    tag = accepting[row]
+                    end = cursor
+            if tag is None or end == start:
+                raise LexerError(text[start], start)
+            yield text[start:end], token_types[tag], start, end
+            start = end
                     
-        yield '$', self.eof
+        yield '$', self.eof, length, length
     
     def __call__(self, text):
-        return [ Token(lex, ttype) for lex, ttype in self._tokenize(text) ]
\ No newline at end of file
+        tokens = []
+        for lex, ttype, start, end in self._tokenize(text):
+            token = Token(lex, ttype)
+            token.start, token.end = start, end
+            tokens.append(token)
+        return tokens
+
+def lexer_fingerprint(table):
+    h = hashlib.sha256()
+    h.update(f"{LEXER_FORMAT_VERSION}\n".encode('utf8'))
+    for token_type, regex in table:
+        h.update(f"{token_type}\t{regex!r}\n".encode('utf8'))
+    return h.hexdigest()
\ No newline at end of file
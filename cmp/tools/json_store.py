@@ -0,0 +1,58 @@
+import json
+import os
+
+TMP_SUFFIX = '.tmp'
+
+def write_json(path, data):
+    """
+    Writes `data` to `path` through a temporary file renamed over it, so
+    readers see either the old file or the whole new one.
+    """
+    tmp_path = f"{path}.{os.getpid()}{TMP_SUFFIX}"
+    try:
+        with open(tmp_path, 'w', encoding='utf8') as file:
+            json.dump(data, file, separators=(',', ':'))
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+def read_json(path, version, fingerprint, field='fingerprint'):
+    """
+    The data written to `path` by `write_json`, or None when it is missing,
+    unreadable, of another format `version`, or its `field` does not match
+    `fingerprint`.
+    """
+    try:
+        with open(path, 'r', encoding='utf8') as file:
+            data = json.load(file)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(data, dict) or data.get('version') != version or data.get(field) != fingerprint:
+        return None
+    return data
+
+def load_or_build(cache_dir, fingerprint, load, build, save):
+    """
+    Runs `load(path)` on the file cached for `fingerprint` in `cache_dir`, or,
+    when it returns False, `build()` and then `save(path)` to fill the cache.
+    Without a `cache_dir` it only builds. A cache that cannot be written is
+    ignored.
+    """
+    if cache_dir is None:
+        build()
+        return
+
+    path = os.path.join(cache_dir, f"{fingerprint[:32]}.json")
+    if load(path):
+        return
+
+    build()
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        save(path)
+    except OSError:
+        pass
@@ -1,3 +1,17 @@
+import hashlib
+from array import array
+
+from cmp.pycompiler import EOF
+from cmp.tools.json_store import read_json, write_json
+
+TABLE_FORMAT_VERSION = 1
+
+# Compiled action table entries are `target << OPCODE_BITS | opcode`, where the
+# target is the next state for a shift and the production number for a reduce.
+OPCODE_BITS = 2
+OPCODE_MASK = (1 << OPCODE_BITS) - 1
+ERROR_CODE, SHIFT_CODE, REDUCE_CODE, OK_CODE = range(4)
+
 class ShiftReduceParser:
     SHIFT = 'SHIFT'
     REDUCE = 'REDUCE'
@@ -8,44 +22,197 @@ class ShiftReduceParser:
         self.verbose = verbose
         self.action = {}
         self.goto = {}
+        self.conflictType = {}
         self._build_parsing_table()
+        self._compile_tables()
     
     def _build_parsing_table(self):
         raise NotImplementedError()
 
     def __call__(self, w):
+        terminals = self._terminal_index
+        action, goto = self._action_table, self._goto_table
+        width, goto_width = self._action_width, self._goto_width
+        lengths, lefts, productions = self._production_lengths, self._production_lefts, self._productions
+        unknown = width - 1
+        lookaheads = [ terminals.get(token.token_type, unknown) for token in w ]
+
         stack = [ 0 ] #S 
         cursor = 0
         output = []
         operations = []
+        push, record, emit = stack.append, operations.append, output.append
+        SHIFT, REDUCE, verbose = self.SHIFT, self.REDUCE, self.verbose
         
+        state = 0
         while True:
-            state = stack[-1]
-            lookahead = w[cursor].token_type
-            if self.verbose: print(stack, '<---||--->', w[cursor:])
-            try:
-                action, tag = self.action[state, lookahead]
-                if action == self.SHIFT:
-                    operations.append("SHIFT")
-                    stack.append(tag)
-                    cursor += 1
-                elif action == self.REDUCE:
-                    operations.append("REDUCE")
-                    l = len(tag.Right)
-                    while l > 0:
-                        stack.pop()
-                        l -= 1
-                    output.append(tag)
-                    last = stack[-1]
-                    stack.append(self.goto[last, tag.Left])
-                elif action == self.OK:
-                    return output, operations, True
+            lookahead = lookaheads[cursor]
+            if verbose: print(stack, '<---||--->', w[cursor:])
+            code = action[state * width + lookahead]
+            op = code & OPCODE_MASK
+            if op == SHIFT_CODE:
+                record(SHIFT)
+                state = code >> OPCODE_BITS
+                push(state)
+                cursor += 1
+            elif op == REDUCE_CODE:
+                record(REDUCE)
+                tag = code >> OPCODE_BITS
+                l = lengths[tag]
+                if l:
+                    del stack[-l:]
+                emit(productions[tag])
+                state = goto[stack[-1] * goto_width + lefts[tag]]
+                if state < 0:
+                    break
+                push(state)
+            elif op == OK_CODE:
+                return output, operations, True
+            else:
+                break
+
+        s = pprint_w(w[:(cursor + 1)])
+        return f"Error! String does not match Grammars generated language: \n {s}", operations, False
+
+    def evaluate(self, w):
+        """
+        Parses `w` evaluating the synthesized attribute of every production as
+        soon as it is reduced. Returns `(root, True)`, or the error message and
+        `False` when `w` is rejected.
+        """
+        terminals = self._terminal_index
+        action, goto = self._action_table, self._goto_table
+        width, goto_width = self._action_width, self._goto_width
+        lengths, lefts, rules = self._production_lengths, self._production_lefts, self._production_rules
+        productions = self._productions
+        unknown = width - 1
+
+        stack = [ 0 ]
+        values = []
+        push, push_value = stack.append, values.append
+        cursor = 0
+        
+        state = 0
+        while True:
+            token = w[cursor]
+            code = action[state * width + terminals.get(token.token_type, unknown)]
+            op = code & OPCODE_MASK
+            if op == SHIFT_CODE:
+                state = code >> OPCODE_BITS
+                push(state)
+                push_value(token.lex)
+                cursor += 1
+            elif op == REDUCE_CODE:
+                tag = code >> OPCODE_BITS
+                rule = rules[tag]
+                if rule is None:
+                    rule = rules[tag] = synthesized_rule(productions[tag])
+                assert rule is not None, 'Productions must define a synthesized attribute.'
+                l = lengths[tag]
+                if l:
+                    del stack[-l:]
+                    values[-l:] = [ rule(None, [ None ] + values[-l:]) ]
                 else:
-                    return "Error! Action Table Conflict", operations, False
-            except KeyError:
-                s = pprint_w(w[:(cursor + 1)])
-                #print("Lookahead", lookahead)
-                return f"Error! String does not match Grammars generated language: \n {s}", operations, False
+                    push_value(rule(None, None))
+                state = goto[stack[-1] * goto_width + lefts[tag]]
+                if state < 0:
+                    break
+                push(state)
+            elif op == OK_CODE:
+                assert len(values) == 1
+                assert isinstance(token.token_type, EOF)
+                return values[0], True
+            else:
+                break
+
+        s = pprint_w(w[:(cursor + 1)])
+        return f"Error! String does not match Grammars generated language: \n {s}", False
+
+    def _compile_tables(self):
+        terminals, nonterminals, productions = {}, {}, {}
+        for (_, symbol), (act, tag) in self.action.items():
+            terminals.setdefault(symbol, len(terminals))
+            if act == self.REDUCE:
+                productions.setdefault(tag, len(productions))
+                nonterminals.setdefault(tag.Left, len(nonterminals))
+        for _, symbol in self.goto:
+            nonterminals.setdefault(symbol, len(nonterminals))
+
+        states = 1 + max([ state for state, _ in self.action ] + [ state for state, _ in self.goto ], default=0)
+        # The last column stays empty and catches tokens outside the grammar
+        width, goto_width = len(terminals) + 1, max(len(nonterminals), 1)
+        # Flat machine-int arrays: half the size of lists of ints, and one
+        # contiguous block the parse loop indexes into
+        action = array('i', [ ERROR_CODE ]) * (states * width)
+        goto = array('i', [ -1 ]) * (states * goto_width)
+
+        for (state, symbol), (act, tag) in self.action.items():
+            if act == self.SHIFT:
+                code = tag << OPCODE_BITS | SHIFT_CODE
+            elif act == self.REDUCE:
+                code = productions[tag] << OPCODE_BITS | REDUCE_CODE
+            else:
+                code = OK_CODE
+            action[state * width + terminals[symbol]] = code
+        for (state, symbol), value in self.goto.items():
+            goto[state * goto_width + nonterminals[symbol]] = value
+
+        ordered = sorted(productions, key=productions.get)
+        self._terminal_index = terminals
+        self._action_table, self._goto_table = action, goto
+        self._action_width, self._goto_width = width, goto_width
+        self._productions = ordered
+        self._production_lengths = array('i', [ len(production.Right) for production in ordered ])
+        self._production_lefts = array('i', [ nonterminals[production.Left] for production in ordered ])
+        # Filled by `evaluate` the first time each production is reduced
+        self._production_rules = [ None ] * len(ordered)
+
+    def save_tables(self, path, fingerprint):
+        index = { production: i for i, production in enumerate(self.G.Productions) }
+        action = []
+        for (state, symbol), (act, tag) in self.action.items():
+            if act == self.REDUCE:
+                tag = index[tag]
+            action.append([state, symbol.Name, act, tag])
+        goto = [[state, symbol.Name, value] for (state, symbol), value in self.goto.items()]
+        conflicts = [[state, symbol.Name, kind] for (state, symbol), kind in self.conflictType.items()]
+
+        data = {
+            'version': TABLE_FORMAT_VERSION,
+            'fingerprint': fingerprint,
+            'action': action,
+            'goto': goto,
+            'conflicts': conflicts,
+        }
+        write_json(path, data)
+
+    def load_tables(self, path, fingerprint):
+        data = read_json(path, TABLE_FORMAT_VERSION, fingerprint)
+        if data is None:
+            return False
+
+        productions = self.G.Productions
+        action, goto, conflicts = {}, {}, {}
+        try:
+            for state, name, act, tag in data['action']:
+                if act == self.REDUCE:
+                    tag = productions[tag]
+                action[state, self._symbol(name)] = (act, tag)
+            for state, name, value in data['goto']:
+                goto[state, self._symbol(name)] = value
+            for state, name, kind in data['conflicts']:
+                conflicts[state, self._symbol(name)] = kind
+        except (KeyError, IndexError, ValueError):
+            return False
+
+        self.action, self.goto, self.conflictType = action, goto, conflicts
+        return True
+
+    def _symbol(self, name):
+        symbol = self.G[name]
+        if symbol is None:
+            raise KeyError(name)
+        return symbol
 
     @staticmethod
     def _register(table, key, value, conflict_type: dict):
@@ -61,6 +228,24 @@ class ShiftReduceParser:
         else: 
             table[key] = value
 
+def synthesized_rule(production):
+    try:
+        attributes = production.attributes
+    except AttributeError:
+        return None
+    assert all(rule is None for rule in attributes[1:]), 'There must be only synteticed attributes.'
+    return attributes[0]
+
+def grammar_fingerprint(G, kind=""):
+    h = hashlib.sha256()
+    h.update(f"{TABLE_FORMAT_VERSION}:{kind}\n".encode('utf8'))
+    h.update(' '.join(t.Name for t in G.terminals).encode('utf8') + b'\n')
+    h.update(' '.join(nt.Name for nt in G.nonTerminals).encode('utf8') + b'\n')
+    for production in G.Productions:
+        body = ' '.join(symbol.Name for symbol in production.Right)
+        h.update(f"{production.Left.Name} -> {body}\n".encode('utf8'))
+    return h.hexdigest()
+
 def conflict_chain(p):
     q = [(0, [0], "")]
     visited = set()
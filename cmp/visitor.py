@@ -22,7 +22,7 @@
 
 import inspect
 
-__all__ = ['on', 'when']
+__all__ = ['on', 'when', 'static_dispatch']
 
 def on(param_name):
   def f(fn):
@@ -46,30 +46,70 @@ def when(param_type):
   return f
 
 
+def static_dispatch(cls):
+  """
+  Class decorator that replaces every `on`/`when` method of `cls` with a
+  direct lookup in a `{node_class: handler}` table, filled at class creation
+  for the registered node classes and all their known subclasses.
+  """
+  for name in dir(cls):
+    member = getattr(cls, name, None)
+    dispatcher = getattr(member, 'dispatcher', member)
+    if isinstance(dispatcher, Dispatcher):
+      setattr(cls, name, dispatcher.compile())
+  return cls
+
+
 class Dispatcher(object):
   def __init__(self, param_name, fn):
-    frame = inspect.currentframe().f_back.f_back
-    top_level = frame.f_locals == frame.f_globals
     self.param_index = self.__argspec(fn).args.index(param_name)
     self.param_name = param_name
     self.targets = {}
+    self.cache = {}
 
   def __call__(self, *args, **kw):
     typ = args[self.param_index].__class__
-    d = self.targets.get(typ)
+    try:
+      d = self.cache[typ]
+    except KeyError:
+      d = self.cache[typ] = self.resolve(typ)
     if d is not None:
       return d(*args, **kw)
-    else:
-      issub = issubclass
-      t = self.targets
-      ks = t.keys()
-      ans = [t[k](*args, **kw) for k in ks if issub(typ, k)]
-      if len(ans) == 1:
-        return ans.pop()
-      return ans
+    return []
+
+  def resolve(self, typ):
+    # The most specific target along the MRO wins, so a subclass without
+    # its own target runs the one registered for its nearest ancestor.
+    t = self.targets
+    for k in typ.__mro__:
+      if k in t:
+        return t[k]
+    return None
+
+  def compile(self):
+    pending = list(self.targets)
+    while pending:
+      typ = pending.pop()
+      if typ not in self.cache:
+        self.cache[typ] = self.resolve(typ)
+        pending.extend(typ.__subclasses__())
+
+    table, resolve, index = self.cache, self.resolve, self.param_index
+    def visit(*args, **kw):
+      typ = args[index].__class__
+      try:
+        d = table[typ]
+      except KeyError:
+        d = table[typ] = resolve(typ)
+      if d is not None:
+        return d(*args, **kw)
+      return []
+    visit.dispatcher = self
+    return visit
 
   def add_target(self, typ, target):
     self.targets[typ] = target
+    self.cache.clear()
 
   @staticmethod
   def __argspec(fn):
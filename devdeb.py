@@ -1,15 +1,16 @@
 from type_logger import TypeLogger
 from utils import global_upper_graph, set_global_upper
-from cmp.evaluation import evaluate_reverse_parse
 from cmp.tools.LR1_Parser import LR1Parser
 from format_visitor import FormatVisitor
 from grammar import G, lexer, pprint_tokens
 from type_checker import TypeChecker
 from type_collector_builder import TypeBuilder, TypeCollector
 from inference_gatherer import InferenceGatherer
+from pass_manager import PassManager
 from type_inferencer import TypeInferencer
 from type_linker import TypeLinker
 from type_finisher import TypeFinisher
+from variable_resolver import VariableResolver
 
 def format_errors(errors, s = ""):
     count = 1
@@ -26,18 +27,16 @@ def run_pipeline(G, program):
     pprint_tokens(tokens)
     
     parser = LR1Parser(G)
-    parse, operations, result = parser(tokens)
+    ast, result = parser.evaluate(tokens)
     if not result:
-        print(parse)
+        print(ast)
         return
 
-    ast = evaluate_reverse_parse(parse, operations, tokens)
     formatter = FormatVisitor()
-    tree = formatter.visit(ast)
+    collector = TypeCollector()
+    tree, _ = PassManager([formatter, collector]).run(ast)
     print(tree)
     
-    collector = TypeCollector()
-    collector.visit(ast)
     context = collector.context
     print("Context\n", context)
     
@@ -47,15 +46,11 @@ def run_pipeline(G, program):
 
     gatherer = InferenceGatherer(context)
     scope = gatherer.visit(ast)
+    VariableResolver(scope).visit(ast)
     print("Begining of Inferencer -----------------------------------")
-    change = True
     inferencer = TypeInferencer(context)
-    while change:
-        change = inferencer.visit(ast, scope)
-        if inferencer.errors:
-            break
-        print(f"change: {change} ---------------------------------------")
-        #input()
+    visits = inferencer.solve(ast, scope)
+    print(f"features visited: {visits} ---------------------------------------")
     
     #ok_till_now = set_global_upper(gatherer.inference_graph)
     #print("set_global_upper:", ok_till_now)
@@ -0,0 +1,144 @@
+from AST import (
+    AssignNode, AtomicNode, AttrDeclarationNode, BinaryNode, BlockNode,
+    CallNode, CaseDeclarationNode, ClassDeclarationNode, FuncDeclarationNode,
+    HyphenNode, IfDeclarationNode, IsVoidDeclarationNode, LetDeclarationNode,
+    Node, NotNode, ProgramNode, VarDeclarationNode, WhileDeclarationNode)
+
+# Fields holding the children of every node, in the order they are visited
+CHILDREN = {
+    ProgramNode: ('declarations',),
+    ClassDeclarationNode: ('features',),
+    AttrDeclarationNode: ('expr',),
+    FuncDeclarationNode: ('body',),
+    VarDeclarationNode: ('expr',),
+    BlockNode: ('body',),
+    IfDeclarationNode: ('ifexpr', 'thenexpr', 'elseexpr'),
+    WhileDeclarationNode: ('whileexpr', 'bodyexpr'),
+    LetDeclarationNode: ('letvars', 'expr'),
+    CaseDeclarationNode: ('expr', 'casevars'),
+    IsVoidDeclarationNode: ('expr',),
+    NotNode: ('lex',),
+    HyphenNode: ('lex',),
+    AssignNode: ('expr',),
+    CallNode: ('obj', 'args'),
+    BinaryNode: ('left', 'right'),
+    AtomicNode: (),
+}
+
+_fields = {}
+
+def fields(typ):
+    try:
+        return _fields[typ]
+    except KeyError:
+        result = _fields[typ] = next((CHILDREN[k] for k in typ.__mro__ if k in CHILDREN), ())
+        return result
+
+def children(node):
+    result = []
+    for field in fields(node.__class__):
+        value = getattr(node, field, None)
+        if isinstance(value, Node):
+            result.append(value)
+        elif isinstance(value, (list, tuple)):
+            # Lists of nodes, and the (obj, type) pair of static calls
+            result.extend(item for item in value if isinstance(item, Node))
+    return result
+
+
+class Pass:
+    """
+    A pass written as hooks on a shared traversal. `enter` runs on a node
+    before its children and `leave` after them, both receiving the node and
+    its depth, and are usually dispatched with `visitor.on`/`visitor.when`.
+
+    `requires` lists the pass classes that must have seen the whole tree
+    before this pass starts, which keeps them out of the same traversal.
+    Passes sharing a traversal run their hooks on every node in list order,
+    so a pass sees the changes the earlier ones made to the node; what it
+    reads after its children were visited may already be rewritten.
+    """
+    requires = ()
+
+    def enter(self, node, depth):
+        pass
+
+    def leave(self, node, depth):
+        pass
+
+    def finish(self, root):
+        return None
+
+    def visit(self, node):
+        return PassManager([ self ]).run(node)[0]
+
+
+class PassManager:
+    """
+    Runs a list of passes in order, fusing consecutive passes into a single
+    traversal of the tree unless one of them requires another in the group.
+    With `fuse=False` every pass gets its own traversal.
+    """
+    def __init__(self, passes, fuse=True):
+        self.passes = list(passes)
+        self.schedule = self._build_schedule(self.passes) if fuse else [ [p] for p in self.passes ]
+
+    @staticmethod
+    def _build_schedule(passes):
+        schedule = []
+        for p in passes:
+            group = schedule[-1] if schedule else None
+            if group is None or any(isinstance(q, tuple(p.requires)) for q in group):
+                schedule.append([ p ])
+            else:
+                group.append(p)
+        return schedule
+
+    def run(self, root):
+        results = {}
+        for group in self.schedule:
+            self.traverse(root, group)
+            for p in group:
+                results[id(p)] = p.finish(root)
+        return [ results[id(p)] for p in self.passes ]
+
+    @staticmethod
+    def traverse(root, passes):
+        plans = {}
+
+        def visit(node, depth):
+            typ = node.__class__
+            try:
+                enters, node_fields, leaves = plans[typ]
+            except KeyError:
+                enters, node_fields, leaves = plans[typ] = (
+                    [ hook for hook in (_hook(p, 'enter', typ) for p in passes) if hook ],
+                    fields(typ),
+                    [ hook for hook in (_hook(p, 'leave', typ) for p in passes) if hook ],
+                )
+            for enter in enters:
+                enter(node, depth)
+            for field in node_fields:
+                value = getattr(node, field, None)
+                if isinstance(value, Node):
+                    visit(value, depth + 1)
+                elif isinstance(value, (list, tuple)):
+                    for child in value:
+                        if isinstance(child, Node):
+                            visit(child, depth + 1)
+            for leave in leaves:
+                leave(node, depth)
+
+        visit(root, 0)
+
+def _hook(p, name, typ):
+    # Passes pay nothing on nodes they have no hook for: dispatched hooks are
+    # resolved once per node class and the empty defaults of `Pass` dropped.
+    method = getattr(type(p), name)
+    if method is getattr(Pass, name):
+        return None
+    dispatcher = getattr(method, 'dispatcher', None)
+    if dispatcher is None:
+        return getattr(p, name)
+    target = dispatcher.resolve(typ)
+    return target.__get__(p) if target is not None else None
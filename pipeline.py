@@ -1,45 +1,122 @@
-from cmp.evaluation import evaluate_reverse_parse
+import importlib
+
 from cmp.tools.LR1_Parser import LR1Parser
+from cmp.tools.shift_reduce_parser import grammar_fingerprint
 from format_visitor import FormatVisitor
 from grammar import lexer
 from inference_gatherer import InferenceGatherer
+from pass_manager import PassManager
+from profiling import StageProfiler
+from result_cache import ResultCache, source_fingerprint
 from type_collector_builder import TypeBuilder, TypeCollector
 from type_inferencer import TypeInferencer
 from type_linker import TypeLinker
+from variable_resolver import VariableResolver
+
+# Modules whose code decides the results of a run
+COMPILER_MODULES = (
+    'AST', 'grammar', 'utils', 'cmp.utils', 'cmp.pycompiler', 'cmp.automata', 'cmp.tools.Old.automata03',
+    'cmp.tools.Old.grammar', 'cmp.tools.shift_reduce_parser', 'cmp.tools.LR1_Parser', 'cmp.visitor',
+    'cmp.semantic', 'pass_manager', 'format_visitor', 'type_collector_builder', 'inference_gatherer',
+    'variable_resolver', 'type_inferencer', 'type_linker', __name__,
+)
 
 
 class Pipeline():
-    def __init__(self, G) -> None:
+    def __init__(self, G, cache_dir=None, profile=False) -> None:
         self.parser = LR1Parser(G)
+        self.profiler = StageProfiler(profile)
         self.tree = None
+        self.tokens = []
+        self.errors = []
+        self.inferred = []
+        self.cache = None
+        if cache_dir is not None:
+            self.cache = ResultCache(cache_dir)
+            modules = [ importlib.import_module(name) for name in COMPILER_MODULES ]
+            self.fingerprint = grammar_fingerprint(G, type(self).__name__) + source_fingerprint(*modules)
 
     def __call__(self, program):
-        tokens = lexer(program)
-        parse, operations, result = self.parser(tokens)
+        """
+        Compiles `program` and returns the report of its errors and inferred
+        types. With a cache, unchanged programs are answered from it without
+        running any pass. When profiling, `self.profiler` holds the time,
+        memory and counters of every stage of the run.
+        """
+        self.profiler.start()
+        try:
+            return self.compile(program)
+        finally:
+            self.profiler.stop()
+
+    def compile(self, program):
+        if self.cache is None:
+            return self.run(program)
+
+        with self.profiler.stage('cache lookup') as counters:
+            key = self.cache.key(program, self.fingerprint)
+            entry = self.cache.get(key)
+            counters['hit'] = entry is not None
+        if entry is not None:
+            self.tokens = [ tuple(token) for token in entry['tokens'] ]
+            self.tree = entry['tree']
+            self.errors = entry['errors']
+            self.inferred = [ tuple(pair) for pair in entry['inferred'] ]
+            return entry['report']
+
+        report = self.run(program)
+        with self.profiler.stage('cache store'):
+            self.cache.put(key, {
+                'report': report,
+                'tokens': self.tokens,
+                'tree': self.tree,
+                'errors': self.errors,
+                'inferred': self.inferred,
+            })
+        return report
+
+    def run(self, program):
+        stage = self.profiler.stage
+        with stage('lexer') as counters:
+            tokens = lexer(program)
+            self.tokens = [ (token.lex, token.token_type.Name) for token in tokens ]
+            counters['tokens'] = len(tokens)
+        self.tree = None
+        with stage('parser'):
+            ast, result = self.parser.evaluate(tokens)
         if not result:
-            return parse
+            self.errors = [ ast ]
+            self.inferred = []
+            return ast
         
-        ast = evaluate_reverse_parse(parse, operations, tokens)
-        formatter = FormatVisitor()
-        self.tree = formatter.visit(ast)
-
-        collector = TypeCollector()
-        collector.visit(ast)
-        context = collector.context
+        # The formatter and the collector share one traversal. Every later
+        # pass needs the whole result of the one before it: the builder the
+        # collected types, the resolver the gatherer's scopes, and so on.
+        with stage('collector'):
+            formatter = FormatVisitor()
+            collector = TypeCollector()
+            self.tree, _ = PassManager([formatter, collector]).run(ast)
+            context = collector.context
 
-        builder = TypeBuilder(context)
-        builder.visit(ast)
+        with stage('builder'):
+            builder = TypeBuilder(context)
+            builder.visit(ast)
 
-        gatherer = InferenceGatherer(context)
-        scope = gatherer.visit(ast)
+        with stage('gatherer'):
+            gatherer = InferenceGatherer(context)
+            scope = gatherer.visit(ast)
+        with stage('resolver'):
+            VariableResolver(scope).visit(ast)
 
-        change = True
-        inferencer = TypeInferencer(context)
-        while change:
-            change = inferencer.visit(ast, scope)
+        with stage('inferencer') as counters:
+            inferencer = TypeInferencer(context)
+            counters['feature_visits'] = inferencer.solve(ast, scope)
 
-        linker = TypeLinker(context)
-        linker.visit(ast, scope)
+        with stage('linker'):
+            linker = TypeLinker(context, gatherer.inference_graph)
+            linker.visit(ast, scope)
+        self.errors = collector.errors + builder.errors + linker.errors
+        self.inferred = [ (auto, typex.name) for auto, typex in linker.inferenced ]
 
         s = "Type Collector Errors:\n"
         s = self.format_errors(collector.errors, s)
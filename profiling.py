@@ -0,0 +1,82 @@
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+
+class StageProfiler:
+    """
+    Records the wall time, the memory allocated through `tracemalloc` and
+    any counters of each stage of a run:
+
+        with profiler.stage('parser') as counters:
+            ...
+            counters['tokens'] = len(tokens)
+
+    `allocated_bytes` is what a stage left allocated and `peak_bytes` the
+    most it held at once above its starting point. Peaks need Python 3.9;
+    before that they are None. A disabled profiler measures nothing.
+    """
+    def __init__(self, enabled=True, memory=True):
+        self.enabled = enabled
+        self.memory = memory
+        self.stages = []
+        self._started_tracing = False
+
+    def start(self):
+        self.stages = []
+        if self.enabled and self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+    def stop(self):
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    @contextmanager
+    def stage(self, name):
+        counters = {}
+        if not self.enabled:
+            yield counters
+            return
+
+        tracing = self.memory and tracemalloc.is_tracing()
+        if tracing:
+            if hasattr(tracemalloc, 'reset_peak'):
+                tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+        start = time.perf_counter()
+        try:
+            yield counters
+        finally:
+            record = { 'stage': name, 'seconds': time.perf_counter() - start }
+            if tracing:
+                current, peak = tracemalloc.get_traced_memory()
+                record['allocated_bytes'] = current - before
+                record['peak_bytes'] = peak - before if hasattr(tracemalloc, 'reset_peak') else None
+            record.update(counters)
+            self.stages.append(record)
+
+    def report(self):
+        return {
+            'stages': list(self.stages),
+            'total_seconds': sum(stage['seconds'] for stage in self.stages),
+        }
+
+    def dump(self, path):
+        with open(path, 'w', encoding='utf8') as file:
+            json.dump(self.report(), file, indent=2)
+
+    def __str__(self):
+        lines = [ f"{'stage':<20}{'ms':>10}{'allocated KB':>15}{'peak KB':>10}  counters" ]
+        for stage in self.stages:
+            allocated, peak = stage.get('allocated_bytes'), stage.get('peak_bytes')
+            counters = ', '.join(f"{key}={value}" for key, value in stage.items()
+                                 if key not in { 'stage', 'seconds', 'allocated_bytes', 'peak_bytes' })
+            lines.append(
+                f"{stage['stage']:<20}{stage['seconds'] * 1000:>10.2f}"
+                f"{'-' if allocated is None else f'{allocated / 1024:.1f}':>15}"
+                f"{'-' if peak is None else f'{peak / 1024:.1f}':>10}  {counters}"
+            )
+        return '\n'.join(lines)
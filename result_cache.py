@@ -0,0 +1,105 @@
+import hashlib
+import os
+import time
+
+from cmp.tools.json_store import TMP_SUFFIX, read_json, write_json
+
+CACHE_FORMAT_VERSION = 1
+
+class ResultCache:
+    """
+    Directory of compilation results addressed by the hash of the source
+    text and of the compiler that produced them. Entries are JSON files;
+    reading one refreshes its modification time, and `evict` drops those
+    older than `max_age` seconds and then the least recently used ones
+    until the directory fits in `max_bytes`. Temporary files left by
+    interrupted writes count toward the size and are dropped once they are
+    `TMP_MAX_AGE` seconds old.
+    """
+    EVICT_EVERY = 64
+    TMP_MAX_AGE = 600
+
+    def __init__(self, directory, max_bytes=64 * 1024 * 1024, max_age=7 * 24 * 3600):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._writes = 0
+        os.makedirs(directory, exist_ok=True)
+        self.evict()
+
+    @staticmethod
+    def key(source, fingerprint):
+        h = hashlib.sha256()
+        h.update(f"{CACHE_FORMAT_VERSION}:{fingerprint}\n".encode('utf8'))
+        h.update(source.encode('utf8'))
+        return h.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        path = self._path(key)
+        entry = read_json(path, CACHE_FORMAT_VERSION, key, field='key')
+        if entry is None:
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            return None
+        return entry
+
+    def put(self, key, entry):
+        data = dict(entry, version=CACHE_FORMAT_VERSION, key=key)
+        try:
+            write_json(self._path(key), data)
+        except OSError:
+            return
+        self._writes += 1
+        if self._writes % self.EVICT_EVERY == 0:
+            self.evict()
+
+    def evict(self):
+        entries = []
+        pending = 0
+        now = time.time()
+        for name in os.listdir(self.directory):
+            temporary = name.endswith(TMP_SUFFIX)
+            if not temporary and not name.endswith('.json'):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if now - stat.st_mtime > (self.TMP_MAX_AGE if temporary else self.max_age):
+                self._remove(path)
+            elif temporary:
+                # Possibly still being written: counted, but left alone
+                pending += stat.st_size
+            else:
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = pending + sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+def source_fingerprint(*modules):
+    """Hash of the source files of `modules`, so editing a pass invalidates the cache."""
+    h = hashlib.sha256()
+    for module in modules:
+        path = getattr(module, '__file__', None)
+        if path is None:
+            continue
+        with open(path, 'rb') as file:
+            h.update(file.read())
+    return h.hexdigest()
@@ -0,0 +1,140 @@
+"""
+Resident compile server keeping the grammar, lexer and parser tables warm.
+
+    python server.py                  # JSON lines on stdin/stdout
+    python server.py --socket PATH    # JSON lines on a local Unix socket
+
+Every request is one line holding `{"id": ..., "source": "..."}`, or a
+`"path"` to read the program from, and gets one line back:
+
+    {"id": ..., "ok": true, "errors": [...], "inferred": [[auto, type], ...],
+     "report": "...", "seconds": ...}
+
+`report` is the text `Pipeline.__call__` returns. `{"command": "shutdown"}`
+stops the server.
+"""
+import argparse
+import json
+import os
+import socketserver
+import stat
+import sys
+import threading
+import time
+
+from cmp.tools.Old.automata03 import LexerError
+from grammar import G
+from pipeline import Pipeline
+
+
+class CompileServer:
+    def __init__(self, pipeline=None):
+        self.pipeline = pipeline or Pipeline(G)
+        # A Pipeline keeps the results of its last run, so runs take turns
+        self.lock = threading.Lock()
+        self.running = True
+
+    def handle_line(self, line):
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("requests must be JSON objects")
+        except ValueError as err:
+            return { 'id': None, 'ok': False, 'error': f"Invalid request: {err}" }
+        return self.handle(request)
+
+    def handle(self, request):
+        response = { 'id': request.get('id') }
+        if request.get('command') == 'shutdown':
+            self.running = False
+            response['ok'] = True
+            return response
+
+        try:
+            source = request.get('source')
+            if source is None:
+                with open(request['path'], 'r', encoding='utf8') as file:
+                    source = file.read()
+        except KeyError:
+            response.update(ok=False, error="Requests need a 'source' or a 'path'.")
+            return response
+        except OSError as err:
+            response.update(ok=False, error=str(err))
+            return response
+
+        start = time.perf_counter()
+        with self.lock:
+            try:
+                report = self.pipeline(source)
+            except LexerError as err:
+                response.update(ok=False, error=err.text, position=err.position)
+                return response
+            except Exception as err:
+                response.update(ok=False, error=f"{type(err).__name__}: {err}")
+                return response
+            errors, inferred = list(self.pipeline.errors), list(self.pipeline.inferred)
+        response.update(
+            ok=True,
+            errors=errors,
+            inferred=[ list(pair) for pair in inferred ],
+            report=report,
+            seconds=time.perf_counter() - start,
+        )
+        return response
+
+    def serve_stream(self, infile, outfile):
+        for line in infile:
+            if not line.strip():
+                continue
+            outfile.write(json.dumps(self.handle_line(line)) + '\n')
+            outfile.flush()
+            if not self.running:
+                break
+
+    def serve_unix(self, path):
+        server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    if not line.strip():
+                        continue
+                    response = server.handle_line(line.decode('utf8'))
+                    self.wfile.write(json.dumps(response).encode('utf8') + b'\n')
+                    self.wfile.flush()
+                    if not server.running:
+                        threading.Thread(target=self.server.shutdown).start()
+                        break
+
+        try:
+            mode = os.lstat(path).st_mode
+        except FileNotFoundError:
+            pass
+        else:
+            # A socket left by an earlier server is replaced, anything else kept
+            if not stat.S_ISSOCK(mode):
+                raise FileExistsError(f"{path} exists and is not a socket")
+            os.unlink(path)
+        with socketserver.ThreadingUnixStreamServer(path, Handler) as unix_server:
+            unix_server.daemon_threads = True
+            try:
+                unix_server.serve_forever()
+            finally:
+                os.unlink(path)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve Cool compilations over JSON lines.")
+    parser.add_argument('--socket', help="Unix socket path to listen on instead of stdin/stdout")
+    args = parser.parse_args(argv)
+
+    server = CompileServer()
+    if args.socket:
+        try:
+            server.serve_unix(args.socket)
+        except FileExistsError as err:
+            parser.error(str(err))
+    else:
+        server.serve_stream(sys.stdin, sys.stdout)
+
+if __name__ == '__main__':
+    main()
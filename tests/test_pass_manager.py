@@ -0,0 +1,60 @@
+from AST import (
+    AttrDeclarationNode, BlockNode, ClassDeclarationNode, ConstantNumNode,
+    FuncDeclarationNode, PlusNode, ProgramNode, VariableNode)
+from format_visitor import FormatVisitor
+from pass_manager import Pass, PassManager
+from type_collector_builder import TypeCollector
+
+
+def build_program():
+    return ProgramNode([
+        ClassDeclarationNode('Main', [
+            AttrDeclarationNode('x', 'Int', ConstantNumNode('1')),
+            FuncDeclarationNode('main', [], 'Int', BlockNode([ PlusNode(VariableNode('x'), ConstantNumNode('2')) ])),
+        ]),
+        ClassDeclarationNode('B', [ AttrDeclarationNode('y', 'Int') ], 'Main'),
+    ])
+
+def test_fused_output_matches_unfused():
+    alone = FormatVisitor().visit(build_program())
+    fused = PassManager([ FormatVisitor(), TypeCollector() ]).run(build_program())[0]
+    unfused = PassManager([ FormatVisitor(), TypeCollector() ], fuse=False).run(build_program())[0]
+    assert fused == unfused == alone
+    assert 'class Main  {' in fused
+
+def test_fused_collector_matches_unfused():
+    fused, unfused = TypeCollector(), TypeCollector()
+    PassManager([ FormatVisitor(), fused ]).run(build_program())
+    PassManager([ FormatVisitor(), unfused ], fuse=False).run(build_program())
+    assert fused.errors == unfused.errors
+    assert str(fused.context) == str(unfused.context)
+
+
+class Recorder(Pass):
+    def __init__(self, name, log):
+        self.name = name
+        self.log = log
+
+    def enter(self, node, depth):
+        self.log.append((self.name, 'enter', type(node).__name__))
+
+    def leave(self, node, depth):
+        self.log.append((self.name, 'leave', type(node).__name__))
+
+class Dependent(Recorder):
+    requires = (Recorder,)
+
+def test_hooks_run_in_pass_order():
+    log = []
+    PassManager([ Recorder('a', log), Recorder('b', log) ]).run(ProgramNode([]))
+    assert log == [
+        ('a', 'enter', 'ProgramNode'), ('b', 'enter', 'ProgramNode'),
+        ('a', 'leave', 'ProgramNode'), ('b', 'leave', 'ProgramNode'),
+    ]
+
+def test_requires_splits_traversals():
+    log = []
+    manager = PassManager([ Recorder('a', log), Dependent('b', log) ])
+    assert [ len(group) for group in manager.schedule ] == [ 1, 1 ]
+    manager.run(ProgramNode([]))
+    assert [ name for name, _, _ in log ] == [ 'a', 'a', 'b', 'b' ]
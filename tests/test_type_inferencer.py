@@ -0,0 +1,94 @@
+import pytest
+
+pytest.importorskip('utils')
+grammar = pytest.importorskip('grammar')
+
+from cmp.semantic import AutoType
+from cmp.tools.LR1_Parser import LR1Parser
+from inference_gatherer import InferenceGatherer
+from pass_manager import children
+from type_collector_builder import TypeBuilder, TypeCollector
+from type_inferencer import TypeInferencer
+from variable_resolver import VariableResolver
+
+PROGRAMS = {
+    'chain': """
+        class Main inherits IO {
+            main() : Object { out_int(a(1)) };
+            e(v : AUTO_TYPE) : AUTO_TYPE { v };
+            d(v : AUTO_TYPE) : AUTO_TYPE { e(v) };
+            c(v : AUTO_TYPE) : AUTO_TYPE { d(v) };
+            b(v : AUTO_TYPE) : AUTO_TYPE { c(v) };
+            a(v : AUTO_TYPE) : AUTO_TYPE { let w : AUTO_TYPE <- b(v) in w + 0 };
+            x : AUTO_TYPE <- a(3);
+        };
+    """,
+    'scopes': """
+        class Main inherits IO {
+            x : AUTO_TYPE <- 3;
+            main() : AUTO_TYPE {
+                let a : AUTO_TYPE <- 1, b : AUTO_TYPE <- a + 2 in {
+                    case a of n : Int => n + 1; o : Object => 0; esac;
+                    fact(b);
+                }
+            };
+            fact(n : AUTO_TYPE) : AUTO_TYPE { if n = 0 then 1 else n * fact(n - 1) fi };
+        };
+        class Point {
+            px : AUTO_TYPE;
+            init(a : AUTO_TYPE) : AUTO_TYPE { { px <- a; self; } };
+        };
+    """,
+    'errors': """
+        class A { m() : Int { 1 }; };
+        class B { m() : Int { 2 }; };
+        class Main inherits IO {
+            main() : Object { out_int(k(3)) };
+            f(x : AUTO_TYPE) : AUTO_TYPE { x.m() };
+            k(y : AUTO_TYPE) : AUTO_TYPE { y + 1 };
+        };
+    """,
+}
+
+@pytest.fixture(scope='module')
+def parser():
+    return LR1Parser(grammar.G)
+
+def describe(typex):
+    if isinstance(typex, AutoType):
+        return sorted(t.name for t in typex.type_set)
+    return None if typex is None else typex.name
+
+def infer(parser, source, solve):
+    ast, ok = parser.evaluate(grammar.lexer(source))
+    assert ok, ast
+    collector = TypeCollector()
+    collector.visit(ast)
+    TypeBuilder(collector.context).visit(ast)
+    scope = InferenceGatherer(collector.context).visit(ast)
+    VariableResolver(scope).visit(ast)
+
+    inferencer = TypeInferencer(collector.context)
+    if solve:
+        inferencer.solve(ast, scope)
+    else:
+        while inferencer.visit(ast, scope):
+            pass
+
+    types, pending = [], [ ast ]
+    while pending:
+        node = pending.pop()
+        types.append((type(node).__name__, describe(getattr(node, 'inferenced_type', None))))
+        pending.extend(children(node))
+    for typex in collector.context.types.values():
+        for method in typex.methods:
+            types.append((typex.name, method.name, [ describe(t) for t in method.param_types ], describe(method.return_type)))
+    return types, inferencer.errors
+
+@pytest.mark.parametrize('name', sorted(PROGRAMS))
+def test_solve_reaches_the_fixpoint_of_repeated_visits(parser, name):
+    assert infer(parser, PROGRAMS[name], True) == infer(parser, PROGRAMS[name], False)
+
+def test_solve_keeps_going_after_errors(parser):
+    _, errors = infer(parser, PROGRAMS['errors'], True)
+    assert errors
@@ -0,0 +1,133 @@
+import itertools
+import random
+
+import pytest
+
+import cmp.semantic as semantic
+from cmp.semantic import AutoType, Context, SemanticError, Type, TypeSet
+
+
+@pytest.fixture
+def context():
+    context = Context()
+    names = { 'Object': None, 'A': 'Object', 'B': 'A', 'C': 'A', 'D': 'Object', 'E': 'D', 'F': 'E' }
+    for name, parent in names.items():
+        typex = context.create_type(name)
+        if parent is not None:
+            typex.set_parent(context.get_type(parent))
+    return context
+
+def subsets(context, count, seed=0):
+    rng = random.Random(seed)
+    return [ [ t for t in context.type_list if rng.random() < 0.5 ] for _ in range(count) ]
+
+def test_operations_match_set(context):
+    for left, right in itertools.product(subsets(context, 12), repeat=2):
+        a, b = TypeSet(context, context.type_mask(left)), TypeSet(context, context.type_mask(right))
+        x, y = set(left), set(right)
+        assert a | b == x | y and a & b == x & y and a - b == x - y and a ^ b == x ^ y
+        assert a.union(y) == x.union(y) and a.intersection(y) == x & y and a.difference(y) == x - y
+        assert a.symmetric_difference(y) == x ^ y
+        assert a.isdisjoint(b) == x.isdisjoint(y)
+        assert (a <= b) == (x <= y) and (a < b) == (x < y)
+        assert (a >= b) == (x >= y) and (a > b) == (x > y)
+        assert (a == b) == (x == y) and (a != b) == (x != y)
+        assert (x < b) == (x < y) and (x > b) == (x > y)
+
+@pytest.mark.parametrize('op', [ '__ior__', '__iand__', '__isub__', '__ixor__' ])
+def test_in_place_operators_mutate(context, op):
+    for left, right in itertools.product(subsets(context, 6, 1), repeat=2):
+        a = TypeSet(context, context.type_mask(left))
+        alias = a
+        expected = getattr(set(left), op)(set(right))
+        result = getattr(a, op)(TypeSet(context, context.type_mask(right)))
+        assert result is a and alias == expected
+
+def test_in_place_methods_mutate(context):
+    left, right = subsets(context, 2, 2)
+    for name in [ 'update', 'intersection_update', 'difference_update', 'symmetric_difference_update' ]:
+        a, x = TypeSet(context, context.type_mask(left)), set(left)
+        alias = a
+        assert getattr(a, name)(set(right)) is None
+        getattr(x, name)(set(right))
+        assert alias == x
+
+def test_remove_discard_pop(context):
+    a = TypeSet(context, context.type_mask(context.type_list))
+    b = context.get_type('B')
+    a.remove(b)
+    with pytest.raises(KeyError):
+        a.remove(b)
+    a.discard(b)
+    popped = set()
+    while a:
+        popped.add(a.pop())
+    assert popped == set(context.type_list) - { b }
+    with pytest.raises(KeyError):
+        a.pop()
+
+def test_types_from_elsewhere(context):
+    a = TypeSet(context, context.type_mask([ context.get_type('A') ]))
+    foreign = Type('Foreign')
+    assert a | { foreign } == { context.get_type('A'), foreign }
+    assert isinstance(a | { foreign }, set)
+    with pytest.raises(SemanticError):
+        a |= { foreign }
+    a &= { foreign }
+    assert not a
+
+def plain_sets(monkeypatch):
+    monkeypatch.setattr(semantic, 'as_type_set', lambda types: set(types.values() if isinstance(types, dict) else types))
+
+def auto_paths(context):
+    get = context.get_type
+    auto = AutoType('x', [ get('Object') ], context.type_list)
+    auto.set_upper_limmit([ get('A'), get('D') ])
+    first = (set(auto.type_set), [ t.name for t in auto.upper_limmit ])
+    auto.set_new_conditions([ { get('A') } ], [ semantic.set_intersection(get('A'), auto.type_set) | { get('E') } ])
+    second = (set(auto.type_set), [ t.name for t in auto.upper_limmit ])
+    auto.set_upper_limmit([ get('C') ])
+    return first, second, (set(auto.type_set), [ t.name for t in auto.upper_limmit ])
+
+def test_auto_type_paths_match_plain_sets(context, monkeypatch):
+    with_type_set = auto_paths(context)
+    plain_sets(monkeypatch)
+    assert with_type_set == auto_paths(context)
+
+GATHERED = """
+class A { m() : Int { 1 }; };
+class B inherits A { n(x : AUTO_TYPE) : AUTO_TYPE { if x then 1 else 2 fi }; };
+class Main inherits IO {
+    main() : Object { out_int(f(new B, 3)) };
+    f(o : AUTO_TYPE, k : AUTO_TYPE) : AUTO_TYPE {
+        let v : AUTO_TYPE <- o.m() in case k of i : Int => v + i; s : String => 0; esac
+    };
+};
+"""
+
+def gather(parser, grammar):
+    from inference_gatherer import InferenceGatherer
+    from pass_manager import children
+    from type_collector_builder import TypeBuilder, TypeCollector
+    ast, _ = parser.evaluate(grammar.lexer(GATHERED))
+    collector = TypeCollector()
+    collector.visit(ast)
+    TypeBuilder(collector.context).visit(ast)
+    InferenceGatherer(collector.context).visit(ast)
+    result, pending = [], [ ast ]
+    while pending:
+        node = pending.pop()
+        typex = getattr(node, 'inferenced_type', None)
+        if isinstance(typex, AutoType):
+            result.append((type(node).__name__, sorted(t.name for t in typex.type_set)))
+        pending.extend(children(node))
+    return result
+
+def test_gatherer_matches_plain_sets(monkeypatch):
+    pytest.importorskip('utils')
+    grammar = pytest.importorskip('grammar')
+    from cmp.tools.LR1_Parser import LR1Parser
+    parser = LR1Parser(grammar.G)
+    with_type_set = gather(parser, grammar)
+    plain_sets(monkeypatch)
+    assert with_type_set and with_type_set == gather(parser, grammar)
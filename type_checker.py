@@ -16,6 +16,7 @@ INCOMPATIBLE_TYPES = 'Cannot convert "%s" into "%s".'
 VARIABLE_NOT_DEFINED = 'Variable "%s" is not defined.'
 INVALID_OPERATION = 'Operation is not defined between "%s" and "%s".'
 
+@visitor.static_dispatch
 class TypeChecker:
     def __init__(self, context, errors=[]):
         self.context = context
@@ -6,35 +6,29 @@ from cmp.semantic import SemanticError
 from cmp.semantic import Attribute, Method, Type
 from cmp.semantic import VoidType, ErrorType, SelfType
 from cmp.semantic import Context
+from pass_manager import Pass
 
-class TypeCollector(object):
+@visitor.static_dispatch
+class TypeCollector(Pass):
     def __init__(self):
         self.context = None
         self.errors = []
         
         self.class_tree = {"Object":["IO", "String", "Int", "Bool"], "IO":[], "String":[], "Int":[], "Bool":[]}
         self.types_nodes = dict()
+        self.clock = 0
     
     @visitor.on('node')
-    def visit(self, node):
+    def enter(self, node, depth):
         pass
     
     @visitor.when(ProgramNode)
-    def visit(self, node):
+    def enter(self, node, depth):
         self.context = Context()
         self.init_default_classes()
-        
-        for class_def in node.declarations:
-            self.visit(class_def)
-        
-        ordered = []
-        self.check_type_tree(ordered, self.class_tree)
-        node.declarations = ordered
-        self.context.type_tree = self.class_tree
-        self.context.type_tree["<error>"] = tuple()
     
     @visitor.when(ClassDeclarationNode)
-    def visit(self, node):
+    def enter(self, node, depth):
         try:
             self.context.create_type(node.id)
             if node.id[0] != node.id[0].upper():
@@ -57,6 +51,19 @@ class TypeCollector(object):
         except SemanticError as err:
             self.errors.append(err.text)
 
+    @visitor.on('node')
+    def leave(self, node, depth):
+        pass
+
+    @visitor.when(ProgramNode)
+    def leave(self, node, depth):
+        ordered = []
+        self.check_type_tree(ordered, self.class_tree)
+        node.declarations = ordered
+        self.context.type_tree = self.class_tree
+        self.context.type_tree["<error>"] = tuple()
+        self.context.build_lca_index()
+
     def init_default_classes(self):
         self.context.create_type('Object').index = 0
         self.context.create_type('String')
@@ -66,7 +73,9 @@ class TypeCollector(object):
 
     def check_type_tree(self, ordered, graph):
         visited = set(["Object"])
+        self.clock = 0
         self.get_type_hierarchy("Object", graph, visited, ordered, 1)
+        self.context.get_type("Object").interval = (0, self.clock)
         
         for node in graph:
             if not node in visited:
@@ -82,8 +91,13 @@ class TypeCollector(object):
                 visited.add(node)
                 if node not in {"Int", "String", "IO", "Bool", "Object"}:
                     ordered.append(self.types_nodes[node])
-                self.context.get_type(node).index = index
+                typex = self.context.get_type(node)
+                typex.index = index
+                self.clock += 1
+                start = self.clock
                 self.get_type_hierarchy(node, graph, visited, ordered, index + 1)
+                # Preorder interval spanning every type that inherits from node
+                typex.interval = (start, self.clock)
 
 def get_circular_heritage(root, graph, path:list, visited:set):
     if not root in graph:
@@ -106,6 +120,7 @@ def show_circular_heritage(visited : list, node) -> str:
     s = " -> ".join(child for child in visited)
     return s
 
+@visitor.static_dispatch
 class TypeBuilder:
     def __init__(self, context):
         self.context = context
@@ -122,6 +137,7 @@ class TypeBuilder:
 
         for class_def in node.declarations:
             self.visit(class_def)
+        self.context.freeze_tables()
 
         try:
             self.context.get_type('Main').get_method('main', local=True)
@@ -12,6 +12,7 @@ from cmp.semantic import Attribute, Method, Type
 from cmp.semantic import VoidType, ErrorType, IntType, SelfType
 from cmp.semantic import Context, Scope
 
+@visitor.static_dispatch
 class TypeFinisher:
     def __init__(self, context):
         self.context:Context = context
@@ -143,7 +144,7 @@ class TypeFinisher:
     @visitor.when(AssignNode)
     def visit(self, node, scope):
         if node.define:
-            var = scope.find_variable(node.id)
+            var = scope.get_variable(node.id, node.address)
             var.type = self.update_var(var.type)
             node.computed_type = self.update(node)
         else:
@@ -155,7 +156,7 @@ class TypeFinisher:
     def visit(self, node, scope):
         if node.define:
             node.computed_type = self.update(node)
-            var = scope.find_variable(node.lex)
+            var = scope.get_variable(node.lex, node.address)
             var.type = self.update_var(var.type)
         else:
             node.computed_type = ErrorType()
@@ -3,6 +3,7 @@ import cmp.visitor as visitor
 from cmp.semantic import AutoType, Context, ErrorType, Scope, SelfType, SemanticError, Type
 from AST import AssignNode, AttrDeclarationNode, BlockNode, CallNode, CaseDeclarationNode, CaseVarNode, ClassDeclarationNode, ComparisonNode, ConstantBoolNode, ConstantNumNode, ConstantStringNode, FuncDeclarationNode, HyphenNode, IfDeclarationNode, InstantiateNode, IsVoidDeclarationNode, LetDeclarationNode, NotNode, OperationNode, ProgramNode, VarDeclarationNode, VariableNode, WhileDeclarationNode
 
+@visitor.static_dispatch
 class TypeInferencer:
     def __init__(self, context:Context):
         self.context = context
@@ -24,6 +25,20 @@ class TypeInferencer:
         scope.reset()
         return self.types_updated
     
+    def solve(self, node:ProgramNode, scope:Scope):
+        """
+        Sweeps the program until a sweep changes no AUTO_TYPE and returns the
+        number of feature visits. AUTO_TYPEs are also narrowed in place
+        without reporting a change, so the result depends on the order of
+        the visits: only whole sweeps in program order reach the fixpoint of
+        repeated `visit` calls.
+        """
+        features = sum(len(declaration.features) for declaration in node.declarations)
+        visits = features
+        while self.visit(node, scope):
+            visits += features
+        return visits
+
     @visitor.when(ClassDeclarationNode)
     def visit(self, node:ClassDeclarationNode, scope):
         self.current_type = self.context.get_type(node.id)
@@ -185,7 +200,7 @@ class TypeInferencer:
             var = None
             var_type = ErrorType()
         else:
-            var = scope.find_variable(node.id)
+            var = scope.get_variable(node.id, node.address)
             var_type = var.type
 
         expr_inferred = node.expr.inferenced_type
@@ -341,7 +356,7 @@ class TypeInferencer:
     def visit(self, node, scope):
         
         if node.define:
-            var = scope.find_variable(node.lex)
+            var = scope.get_variable(node.lex, node.address)
             var.type = self.update_type(var.type)
             var_type =var.type
         else:
@@ -404,4 +419,4 @@ class TypeInferencer:
         current_type = f"In class \"{self.current_type.name}\", "
         current_loc = f"in method \"{self.current_method.name}\". " if self.current_method else ""  
         current_loc = f"in attribute \"{self.current_attrb.name}\". " if self.current_attrb else current_loc
-        self.errors.append(current_type + current_loc + extra + " " + prefixed)
\ No newline at end of file
+        self.errors.append(current_type + current_loc + extra + " " + prefixed)
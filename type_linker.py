@@ -27,6 +27,7 @@ INCOMPATIBLE_TYPES = 'Cannot convert "%s" into "%s".'
 VARIABLE_NOT_DEFINED = 'Variable "%s" is not defined.'
 INVALID_OPERATION = 'Operation is not defined between "%s" and "%s".'
 
+@visitor.static_dispatch
 class TypeLinker:
     def __init__(self, context,  inference_graph):
         self.context:Context = context
@@ -273,7 +274,7 @@ class TypeLinker:
 
     @visitor.when(AssignNode)
     def visit(self, node, scope):
-        var = scope.find_variable(node.id)
+        var = scope.get_variable(node.id, node.address)
         if node.define:
             var.type = self.all_pos_types(var.type)
             var_type = var.type
@@ -298,7 +299,7 @@ class TypeLinker:
     @visitor.when(VariableNode)
     def visit(self, node, scope):
         if node.define:
-            var = scope.find_variable(node.lex)
+            var = scope.get_variable(node.lex, node.address)
             var.type = self.all_pos_types(var.type)
             node.computed_type = var.type
         else:
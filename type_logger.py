@@ -8,6 +8,7 @@ from AST import (
 from cmp.semantic import Context, Scope
 
 
+@visitor.static_dispatch
 class TypeLogger(object):
     def __init__(self, context) -> None:
         self.context:Context = context
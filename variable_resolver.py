@@ -0,0 +1,87 @@
+import cmp.visitor as visitor
+from AST import AssignNode, CaseVarNode, ClassDeclarationNode, FuncDeclarationNode, LetDeclarationNode, ProgramNode, VariableNode
+from cmp.semantic import Scope
+from pass_manager import Pass
+
+@visitor.static_dispatch
+class VariableResolver(Pass):
+    """
+    Walks the scope tree built by the InferenceGatherer and gives every
+    VariableNode and AssignNode the address of the variable it names, or
+    None when it is not defined. The passes then read it with
+    `Scope.get_variable`.
+
+    The gatherer visits the arguments of a call once per candidate method,
+    and the later passes at most once, so their scope cursors can drift
+    apart after a call. An address is therefore only used by a pass standing
+    in the scope it was resolved from; the others look the name up.
+    """
+    def __init__(self, scope:Scope):
+        self.scope = scope
+        self.scopes = []
+
+    def open_scope(self):
+        scope = self.scopes[-1]
+        if scope.current_child + 1 < len(scope.children):
+            self.scopes.append(scope.next_child())
+        else:
+            # Subtrees the gatherer never visited have no scope of their own
+            self.scopes.append(Scope(scope))
+
+    @visitor.on('node')
+    def enter(self, node, depth):
+        pass
+
+    @visitor.when(ProgramNode)
+    def enter(self, node, depth):
+        self.scope.reset()
+        self.scopes = [ self.scope ]
+
+    @visitor.when(ClassDeclarationNode)
+    def enter(self, node, depth):
+        self.open_scope()
+
+    @visitor.when(FuncDeclarationNode)
+    def enter(self, node, depth):
+        self.open_scope()
+
+    @visitor.when(LetDeclarationNode)
+    def enter(self, node, depth):
+        self.open_scope()
+
+    @visitor.when(CaseVarNode)
+    def enter(self, node, depth):
+        self.open_scope()
+
+    @visitor.when(VariableNode)
+    def enter(self, node, depth):
+        node.address = self.scopes[-1].resolve(node.lex)
+
+    @visitor.when(AssignNode)
+    def enter(self, node, depth):
+        node.address = self.scopes[-1].resolve(node.id)
+
+    @visitor.on('node')
+    def leave(self, node, depth):
+        pass
+
+    @visitor.when(ProgramNode)
+    def leave(self, node, depth):
+        self.scope.reset()
+        self.scopes = []
+
+    @visitor.when(ClassDeclarationNode)
+    def leave(self, node, depth):
+        self.scopes.pop()
+
+    @visitor.when(FuncDeclarationNode)
+    def leave(self, node, depth):
+        self.scopes.pop()
+
+    @visitor.when(LetDeclarationNode)
+    def leave(self, node, depth):
+        self.scopes.pop()
+
+    @visitor.when(CaseVarNode)
+    def leave(self, node, depth):
+        self.scopes.pop()
@@ -7,11 +7,13 @@ from cmp.tools.LR1_Parser import LR1Parser
 from format_visitor import FormatVisitor
 from grammar import G, lexer, pprint_tokens
 from inference_gatherer import InferenceGatherer
+from pass_manager import PassManager
 from type_collector_builder import TypeBuilder, TypeCollector
 from type_finisher import TypeFinisher
 from type_inferencer import TypeInferencer
 from type_linker import TypeLinker
 from type_logger import TypeLogger
+from variable_resolver import VariableResolver
 
 
 def file_selector(folder_path="."):
@@ -86,13 +88,12 @@ if st.button("Submit"):
         
         ast = evaluate_reverse_parse(parse, operations, tokens)
         formatter = FormatVisitor()
-        tree = formatter.visit(ast)
+        collector = TypeCollector()
+        tree, _ = PassManager([formatter, collector]).run(ast)
         if showAST:
             st.write("Building AST")
             st.text(tree)
         s = ""
-        collector = TypeCollector()
-        collector.visit(ast)
         context = collector.context
         if not collector.errors:
             st.success("Collecting Types")
@@ -118,16 +119,11 @@ if st.button("Submit"):
 
         gatherer = InferenceGatherer(context)
         scope = gatherer.visit(ast)
+        VariableResolver(scope).visit(ast)
 
         inferencer = TypeInferencer(context)
-        change = True
-        count = 1
-        while change:
-            change = inferencer.visit(ast, scope)
-            st.write(f"Running Type Inferencer({count})")
-            count += 1
-            if inferencer.errors:
-                break
+        visits = inferencer.solve(ast, scope)
+        st.write(f"Running Type Inferencer({visits} feature visits)")
         
         if not inferencer.errors and not gatherer.errors:
             st.success("Inferencing Types")